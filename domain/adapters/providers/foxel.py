@@ -48,6 +48,9 @@ def _unwrap_success(payload: Any, *, context: str) -> Any:
 
 
 class FoxelAdapter:
+    # 远端 /api/fs 浏览接口的 page_size 上限
+    max_page_size = 500
+
     def __init__(self, record: StorageAdapter):
         self.record = record
         cfg = record.config or {}
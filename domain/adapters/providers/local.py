@@ -1,3 +1,4 @@
+import errno
 import os
 import shutil
 import stat
@@ -30,6 +31,60 @@ def _apply_mode(path: Path, mode: int):
         pass
 
 
+# 每次内核复制调用处理的最大字节数
+KERNEL_COPY_CHUNK = 1 << 30
+# 这些错误表示当前文件系统/内核不支持该复制方式，可以退回下一种
+_KERNEL_COPY_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF,
+}
+
+
+def _kernel_copy(src_path: Path, dst_path: Path) -> int:
+    """在内核态复制文件内容：优先 copy_file_range，其次 sendfile，最后退回 1MiB 缓冲的用户态复制"""
+    with open(src_path, "rb") as fsrc, open(dst_path, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        copied = 0
+        copy_range = getattr(os, "copy_file_range", None)
+        if copy_range is not None:
+            try:
+                while n := copy_range(infd, outfd, KERNEL_COPY_CHUNK):
+                    copied += n
+                return copied
+            except OSError as exc:
+                if copied or exc.errno not in _KERNEL_COPY_FALLBACK_ERRNOS:
+                    raise
+        try:
+            while n := os.sendfile(outfd, infd, copied, KERNEL_COPY_CHUNK):
+                copied += n
+            return copied
+        except OSError as exc:
+            if copied or exc.errno not in _KERNEL_COPY_FALLBACK_ERRNOS:
+                raise
+        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+        return fdst.tell()
+
+
+def _scan_dir_entries(base: Path) -> List[Dict]:
+    """一次 scandir 读出目录全部条目；类型与 stat 取自 DirEntry，整个目录只切换一次线程"""
+    entries = []
+    with os.scandir(base) as it:
+        for entry in it:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            is_dir = stat.S_ISDIR(st.st_mode)
+            entries.append({
+                "name": entry.name,
+                "is_dir": is_dir,
+                "size": 0 if is_dir else st.st_size,
+                "mtime": int(st.st_mtime),
+                "mode": stat.S_IMODE(st.st_mode),
+                "type": "dir" if is_dir else "file",
+            })
+    return entries
+
+
 class LocalAdapter:
     def __init__(self, record: StorageAdapter):
         self.record = record
@@ -52,24 +107,7 @@ class LocalAdapter:
         if not base.is_dir():
             raise NotADirectoryError(rel)
 
-        all_names = await asyncio.to_thread(os.listdir, base)
-        
-        entries = []
-        for name in all_names:
-            fp = base / name
-            try:
-                st = await asyncio.to_thread(fp.stat)
-            except FileNotFoundError:
-                continue
-            is_dir = fp.is_dir()
-            entries.append({
-                "name": name,
-                "is_dir": is_dir,
-                "size": 0 if is_dir else st.st_size,
-                "mtime": int(st.st_mtime),
-                "mode": stat.S_IMODE(st.st_mode),
-                "type": "dir" if is_dir else "file",
-            })
+        entries = await asyncio.to_thread(_scan_dir_entries, base)
 
         # 排序
         reverse = sort_order.lower() == "desc"
@@ -161,10 +199,70 @@ class LocalAdapter:
             await asyncio.to_thread(_apply_mode, fp, DEFAULT_FILE_MODE)
         return size
 
+    async def import_local_file(self, root: str, rel: str, src_path: str | Path):
+        """将本地文件移入存储目录，同一文件系统时为原子 rename，跨文件系统时退化为复制"""
+        fp = _safe_join(root, rel)
+        await asyncio.to_thread(os.makedirs, fp.parent, mode=DEFAULT_DIR_MODE, exist_ok=True)
+
+        def _do_import():
+            try:
+                prev_mode = stat.S_IMODE(fp.stat().st_mode)
+            except FileNotFoundError:
+                prev_mode = DEFAULT_FILE_MODE
+            try:
+                os.replace(src_path, fp)
+            except OSError as exc:
+                if exc.errno != errno.EXDEV:
+                    raise
+                shutil.move(str(src_path), str(fp))
+            _apply_mode(fp, prev_mode)
+            return fp.stat().st_size
+
+        return await asyncio.to_thread(_do_import)
+
+    def get_local_path(self, root: str, rel: str) -> Path:
+        """文件在本机文件系统上的路径，供同机跨挂载复制走内核态快速路径"""
+        return _safe_join(root, rel)
+
+    async def copy_local_file(self, root: str, rel: str, src_path: str | Path):
+        """把本机文件复制到存储目录：先复制到同目录临时文件，再原子替换目标"""
+        fp = _safe_join(root, rel)
+        await asyncio.to_thread(os.makedirs, fp.parent, mode=DEFAULT_DIR_MODE, exist_ok=True)
+
+        def _do_copy():
+            try:
+                prev_mode = stat.S_IMODE(fp.stat().st_mode)
+            except FileNotFoundError:
+                prev_mode = DEFAULT_FILE_MODE
+            tmp_path = fp.with_name(f".{fp.name}.{os.getpid()}.part")
+            try:
+                size = _kernel_copy(Path(src_path), tmp_path)
+                os.replace(tmp_path, fp)
+            except BaseException:
+                try:
+                    tmp_path.unlink()
+                except FileNotFoundError:
+                    pass
+                raise
+            _apply_mode(fp, prev_mode)
+            return size
+
+        return await asyncio.to_thread(_do_copy)
+
     async def mkdir(self, root: str, rel: str):
         fp = _safe_join(root, rel)
         await asyncio.to_thread(os.makedirs, fp, mode=DEFAULT_DIR_MODE, exist_ok=True)
 
+    async def mkdirs(self, root: str, rels: list[str]):
+        """批量创建目录（含父目录），整批只切换一次线程"""
+        paths = [_safe_join(root, rel) for rel in rels]
+
+        def _makedirs():
+            for fp in paths:
+                os.makedirs(fp, mode=DEFAULT_DIR_MODE, exist_ok=True)
+
+        await asyncio.to_thread(_makedirs)
+
     async def delete(self, root: str, rel: str):
         fp = _safe_join(root, rel)
         if not fp.exists():
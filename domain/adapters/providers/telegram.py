@@ -1,8 +1,10 @@
-from typing import List, Dict, Tuple, AsyncIterator, Optional
+from typing import List, Dict, Tuple, AsyncIterator, Awaitable, Callable, Optional, TypeVar
 import asyncio
 import base64
+from collections import OrderedDict
 import io
 import os
+import re
 import struct
 import time
 from models import StorageAdapter
@@ -37,6 +39,43 @@ class _NamedFile:
     def __getattr__(self, name):
         return getattr(self._file, name)
 
+
+T = TypeVar("T")
+
+
+class _TokenBucket:
+    """客户端侧令牌桶：平滑发往 Telegram 的 RPC，并记录 FloodWait 的封禁截止时间"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def penalize(self, seconds: int):
+        if seconds > 0:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def blocked_for(self) -> int:
+        remaining = self._blocked_until - time.monotonic()
+        return int(remaining) + 1 if remaining > 0 else 0
+
+# 单段 Range 请求头，如 bytes=0-1023、bytes=1024-
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
 # 适配器类型标识
 ADAPTER_TYPE = "telegram"
 
@@ -53,10 +92,39 @@ CONFIG_SCHEMA = [
 
 class TelegramAdapter:
     """Telegram 存储适配器 (使用用户 Session)"""
+    # 固定实例属性
+    __slots__ = (
+        "record",
+        "api_id",
+        "api_hash",
+        "session_string",
+        "chat_id_str",
+        "chat_id",
+        "proxy_protocol",
+        "proxy_host",
+        "proxy_port",
+        "proxy",
+        "_client",
+        "_client_lock",
+        "_input_peer",
+        "_rpc_bucket",
+        "_download_lock",
+        "_active_stream_message_id",
+        "_message_cache",
+        "_message_batch",
+        "_message_batch_task",
+    )
     native_video_thumbnail_only = True
     _message_cache_ttl = 300
-    _message_cache_limit = 200
+    _message_cache_limit = 1024
     _download_chunk_size = 512 * 1024
+    _stream_spill_threshold = 10 * 1024 * 1024
+    _stream_spill_buffer_size = 1024 * 1024
+    # Telegram 单文件上限（Premium 账号为 4GB），超出后无论如何都会被拒绝
+    _max_upload_size = 4 * 1024 * 1024 * 1024
+    _message_batch_window = 0.005
+    _rpc_rate = 1.0
+    _rpc_burst = 5
 
     def __init__(self, record: StorageAdapter):
         self.record = record
@@ -91,9 +159,14 @@ class TelegramAdapter:
 
         self._client: TelegramClient | None = None
         self._client_lock = asyncio.Lock()
+        self._input_peer = None
+        self._rpc_bucket = _TokenBucket(self._rpc_rate, self._rpc_burst)
         self._download_lock = asyncio.Lock()
         self._active_stream_message_id: int | None = None
-        self._message_cache: Dict[int, Tuple[float, object]] = {}
+        # 按最近使用排序的 LRU：命中时移到末尾，满了淘汰最前面的条目
+        self._message_cache: OrderedDict[int, Tuple[float, object]] = OrderedDict()
+        self._message_batch: Dict[int, asyncio.Future] | None = None
+        self._message_batch_task: asyncio.Task | None = None
 
     @staticmethod
     def _parse_legacy_session_string(value: str) -> StringSession:
@@ -204,39 +277,106 @@ class TelegramAdapter:
                 await self._client.connect()
             return self._client
 
+    async def _get_input_peer(self, client: TelegramClient):
+        """chat_id（尤其是用户名）只解析一次，之后直接复用 InputPeer，省去每次调用的实体解析"""
+        if self._input_peer is None:
+            self._input_peer = await self._rpc(lambda: client.get_input_entity(self.chat_id))
+        return self._input_peer
+
     async def _disconnect_shared_client(self):
         if self._client and self._client.is_connected():
             await self._client.disconnect()
 
+    async def close(self):
+        """适配器被移除或应用关闭时断开共享客户端"""
+        async with self._client_lock:
+            client, self._client = self._client, None
+            self._input_peer = None
+        if client and client.is_connected():
+            await client.disconnect()
+
     def _clear_message_cache(self):
         self._message_cache.clear()
 
+    def _cache_message(self, message_id: int, message, now: float):
+        self._message_cache[message_id] = (now + self._message_cache_ttl, message)
+        self._message_cache.move_to_end(message_id)
+        if len(self._message_cache) > self._message_cache_limit:
+            self._message_cache.popitem(last=False)
+
     async def _get_cached_message(self, message_id: int):
         now = time.monotonic()
         cached = self._message_cache.get(message_id)
         if cached and cached[0] > now:
+            self._message_cache.move_to_end(message_id)
             return cached[1]
 
-        client = await self._get_connected_client()
-        message = await client.get_messages(self.chat_id, ids=message_id)
-        if message:
-            if len(self._message_cache) >= self._message_cache_limit:
-                oldest_key = min(self._message_cache, key=lambda k: self._message_cache[k][0])
-                self._message_cache.pop(oldest_key, None)
-            self._message_cache[message_id] = (now + self._message_cache_ttl, message)
-        else:
-            self._message_cache.pop(message_id, None)
-        return message
+        # 同一时间窗口内的未命中合并成一次 get_messages(ids=[...]) 请求
+        if self._message_batch is None:
+            self._message_batch = {}
+            self._message_batch_task = asyncio.create_task(self._flush_message_batch())
+        future = self._message_batch.get(message_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._message_batch[message_id] = future
+        # 单个调用方被取消时不影响同批次的其他等待者
+        return await asyncio.shield(future)
+
+    async def _flush_message_batch(self):
+        await asyncio.sleep(self._message_batch_window)
+        batch, self._message_batch = self._message_batch or {}, None
+        message_ids = list(batch)
+        try:
+            client = await self._get_connected_client()
+            peer = await self._get_input_peer(client)
+            messages = await self._rpc(lambda: client.get_messages(peer, ids=message_ids))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        now = time.monotonic()
+        for message_id, message in zip(message_ids, messages):
+            if message:
+                self._cache_message(message_id, message, now)
+            else:
+                self._message_cache.pop(message_id, None)
+            future = batch[message_id]
+            if not future.done():
+                future.set_result(message)
+        for future in batch.values():
+            if not future.done():
+                future.set_result(None)
 
     @staticmethod
     def _get_message_media(message):
         return message.document or message.video or message.photo
 
+    async def _acquire_rpc_slot(self):
+        """FloodWait 未结束时不再向 Telegram 发请求，直接返回 429；否则按令牌桶速率放行。
+        只用于元数据查询、上传和删除；下载不占令牌，播放器拖动进度时的大量 Range 请求不会被节流"""
+        blocked = self._rpc_bucket.blocked_for()
+        if blocked > 0:
+            raise self._retry_later_http_exception(blocked)
+        await self._rpc_bucket.acquire()
+
+    async def _rpc(self, call: Callable[[], Awaitable[T]]) -> T:
+        await self._acquire_rpc_slot()
+        try:
+            return await call()
+        except errors.FloodWaitError as exc:
+            raise self._flood_wait_http_exception(exc)
+
+    def _flood_wait_http_exception(self, exc: errors.FloodWaitError):
+        seconds = int(getattr(exc, "seconds", 0) or 0)
+        self._rpc_bucket.penalize(seconds)
+        return self._retry_later_http_exception(seconds)
+
     @staticmethod
-    def _flood_wait_http_exception(exc: errors.FloodWaitError):
+    def _retry_later_http_exception(seconds: int):
         from fastapi import HTTPException
 
-        seconds = int(getattr(exc, "seconds", 0) or 0)
         if seconds > 0:
             return HTTPException(
                 status_code=429,
@@ -270,6 +410,18 @@ class TelegramAdapter:
             return "image/jpeg"
         return "application/octet-stream"
 
+    @classmethod
+    def _download_window(cls, length: int) -> Tuple[int, int]:
+        """
+        为区间下载选择分片大小与分片数:
+        - 分片大小取不小于区间长度的 2 的幂（4KB 起，最大 _download_chunk_size），满足 MTProto 的对齐要求
+        - 分片数按区间长度计算，交给 iter_download 的 limit，到达区间末尾后不再请求后续分片
+        """
+        request_size = 4096
+        while request_size < length and request_size < cls._download_chunk_size:
+            request_size *= 2
+        return request_size, (length + request_size - 1) // request_size
+
     @staticmethod
     def _parse_message_id(rel: str) -> int:
         try:
@@ -278,6 +430,39 @@ class TelegramAdapter:
         except (ValueError, IndexError):
             raise FileNotFoundError(f"无效的文件路径格式: {rel}")
 
+    @classmethod
+    def _message_to_entry(cls, message) -> Dict | None:
+        """把一条带文件的消息转换为目录条目；message 的属性多为计算属性，各取一次后复用"""
+        media = message.document or message.video or message.photo
+        if not media:
+            return None
+        file_meta = message.file
+        if not file_meta:
+            return None
+
+        message_id = message.id
+        filename = file_meta.name
+        if not filename:
+            text = message.text or ""
+            if '.' in text and len(text) < 256 and '\n' not in text:
+                filename = text
+            else:
+                filename = f"unknown_{message_id}"
+
+        size = file_meta.size
+        if size is None:
+            # 兼容缺失 size 的情况
+            size = cls._get_message_file_size(message, media)
+
+        return {
+            "name": f"{message_id}_{filename}",
+            "is_dir": False,
+            "size": size,
+            "mtime": int(message.date.timestamp()),
+            "type": "file",
+            "has_thumbnail": False,
+        }
+
     def get_effective_root(self, sub_path: str | None) -> str:
         return ""
 
@@ -294,65 +479,31 @@ class TelegramAdapter:
         if rel:
             return cursor_page([], page_size, cursor=cursor)
 
-        client = self._get_client()
+        client = await self._get_connected_client()
+        peer = await self._get_input_peer(client)
         entries = []
         next_cursor = None
-        try:
-            await client.connect()
-            offset_id = int(cursor) if cursor else 0
-            batch_limit = min(max(page_size, 50), 200)
-            while len(entries) < page_size:
-                messages = await client.get_messages(self.chat_id, limit=batch_limit, offset_id=offset_id)
-                if not messages:
-                    next_cursor = None
+        offset_id = int(cursor) if cursor else 0
+        batch_limit = min(max(page_size, 50), 200)
+        while len(entries) < page_size:
+            messages = await self._rpc(lambda: client.get_messages(peer, limit=batch_limit, offset_id=offset_id))
+            if not messages:
+                next_cursor = None
+                break
+
+            offset_id = messages[-1].id
+            next_cursor = str(offset_id)
+            now = time.monotonic()
+            for message in messages:
+                entry = self._message_to_entry(message) if message else None
+                if entry is None:
+                    continue
+                # 列表里点开文件时 stat/read/stream 可直接命中缓存，不再回源 get_messages
+                self._cache_message(message.id, message, now)
+                entries.append(entry)
+                if len(entries) >= page_size:
                     break
 
-                offset_id = messages[-1].id
-                next_cursor = str(offset_id)
-                for message in messages:
-                    if not message:
-                        continue
-
-                    media = message.document or message.video or message.photo
-                    if not media:
-                        continue
-
-                    file_meta = message.file
-                    if not file_meta:
-                        continue
-
-                    filename = file_meta.name
-                    if not filename:
-                        if message.text and '.' in message.text and len(message.text) < 256 and '\n' not in message.text:
-                            filename = message.text
-                        else:
-                            filename = f"unknown_{message.id}"
-
-                    size = file_meta.size
-                    if size is None:
-                        # 兼容缺失 size 的情况
-                        if hasattr(media, "size") and media.size is not None:
-                            size = media.size
-                        elif message.photo and getattr(message.photo, "sizes", None):
-                            photo_size = message.photo.sizes[-1]
-                            size = getattr(photo_size, "size", 0) or 0
-                        else:
-                            size = 0
-
-                    entries.append({
-                        "name": f"{message.id}_{filename}",
-                        "is_dir": False,
-                        "size": size,
-                        "mtime": int(message.date.timestamp()),
-                        "type": "file",
-                        "has_thumbnail": False,
-                    })
-                    if len(entries) >= page_size:
-                        break
-        finally:
-            if client.is_connected():
-                await client.disconnect()
-
         return cursor_page(entries, page_size, cursor=cursor, next_cursor=next_cursor)
 
     async def read_file(self, root: str, rel: str) -> bytes:
@@ -397,14 +548,16 @@ class TelegramAdapter:
             raise HTTPException(status_code=416, detail="Requested Range Not Satisfiable")
 
         limit = end - start + 1
+        request_size, chunk_count = self._download_window(limit)
         data = bytearray()
         try:
             async with self._download_lock:
                 async for chunk in client.iter_download(
                     media,
                     offset=start,
-                    request_size=self._download_chunk_size,
-                    chunk_size=self._download_chunk_size,
+                    limit=chunk_count,
+                    request_size=request_size,
+                    chunk_size=request_size,
                     file_size=file_size or None,
                 ):
                     if not chunk:
@@ -422,79 +575,91 @@ class TelegramAdapter:
 
     async def write_file(self, root: str, rel: str, data: bytes):
         """将字节数据作为文件上传"""
-        client = self._get_client()
+        client = await self._get_connected_client()
         file_like = io.BytesIO(data)
         file_like.name = os.path.basename(rel) or "file"
 
-        try:
-            await client.connect()
-            sent = await client.send_file(self.chat_id, file_like, caption=file_like.name)
-            message = sent[0] if isinstance(sent, list) and sent else sent
-            actual_rel = rel
-            if message:
-                stored_name = file_like.name
-                file_meta = getattr(message, "file", None)
-                if file_meta and getattr(file_meta, "name", None):
-                    stored_name = file_meta.name
-                if getattr(message, "id", None) is not None:
-                    actual_rel = f"{message.id}_{stored_name}"
-                    self._clear_message_cache()
-            return {"rel": actual_rel, "size": len(data)}
-        finally:
-            if client.is_connected():
-                await client.disconnect()
+        peer = await self._get_input_peer(client)
+        sent = await self._rpc(lambda: client.send_file(peer, file_like, caption=file_like.name))
+        message = sent[0] if isinstance(sent, list) and sent else sent
+        actual_rel = rel
+        if message:
+            stored_name = file_like.name
+            file_meta = getattr(message, "file", None)
+            if file_meta and getattr(file_meta, "name", None):
+                stored_name = file_meta.name
+            if getattr(message, "id", None) is not None:
+                actual_rel = f"{message.id}_{stored_name}"
+                self._clear_message_cache()
+        return {"rel": actual_rel, "size": len(data)}
 
     async def write_upload_file(self, root: str, rel: str, file_obj, filename: str | None, file_size: int | None = None, content_type: str | None = None):
-        client = self._get_client()
+        client = await self._get_connected_client()
         name = filename or os.path.basename(rel) or "file"
         file_like = _NamedFile(file_obj, name)
 
-        try:
-            await client.connect()
-            sent = await client.send_file(
-                self.chat_id,
-                file_like,
-                caption=file_like.name,
-                file_size=file_size,
-                mime_type=content_type,
-            )
-            message = sent[0] if isinstance(sent, list) and sent else sent
-            actual_rel = rel
-            size = file_size or 0
-            if message:
-                stored_name = file_like.name
-                file_meta = getattr(message, "file", None)
-                if file_meta and getattr(file_meta, "name", None):
-                    stored_name = file_meta.name
-                if getattr(message, "id", None) is not None:
-                    actual_rel = f"{message.id}_{stored_name}"
-                    self._clear_message_cache()
-                if file_meta and getattr(file_meta, "size", None):
-                    size = int(file_meta.size)
-            return {"rel": actual_rel, "size": size}
-        finally:
-            if client.is_connected():
-                await client.disconnect()
+        peer = await self._get_input_peer(client)
+        sent = await self._rpc(lambda: client.send_file(
+            peer,
+            file_like,
+            caption=file_like.name,
+            file_size=file_size,
+            mime_type=content_type,
+        ))
+        message = sent[0] if isinstance(sent, list) and sent else sent
+        actual_rel = rel
+        size = file_size or 0
+        if message:
+            stored_name = file_like.name
+            file_meta = getattr(message, "file", None)
+            if file_meta and getattr(file_meta, "name", None):
+                stored_name = file_meta.name
+            if getattr(message, "id", None) is not None:
+                actual_rel = f"{message.id}_{stored_name}"
+                self._clear_message_cache()
+            if file_meta and getattr(file_meta, "size", None):
+                size = int(file_meta.size)
+        return {"rel": actual_rel, "size": size}
 
     async def write_file_stream(self, root: str, rel: str, data_iter: AsyncIterator[bytes]):
         """以流式方式上传文件"""
-        client = self._get_client()
         filename = os.path.basename(rel) or "file"
-        import tempfile
-        suffix = os.path.splitext(filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tf:
-            temp_path = tf.name
-        
+        # 流的总长度事先未知，而 Telethon 需要文件大小来划分分片；
+        # 小文件直接在内存中攒齐后上传，超过阈值才落盘到临时文件
+        buffer = bytearray()
+        temp_path: str | None = None
+        temp_file = None
         total_size = 0
         try:
-            with open(temp_path, "wb") as f:
-                async for chunk in data_iter:
-                    if chunk:
-                        f.write(chunk)
-                        total_size += len(chunk)
-            
-            await client.connect()
-            sent = await client.send_file(self.chat_id, temp_path, caption=filename)
+            async for chunk in data_iter:
+                if not chunk:
+                    continue
+                total_size += len(chunk)
+                if total_size > self._max_upload_size:
+                    from fastapi import HTTPException
+
+                    raise HTTPException(status_code=413, detail="文件超过 Telegram 单文件大小上限")
+                if temp_file is not None:
+                    temp_file.write(chunk)
+                    continue
+                buffer.extend(chunk)
+                if len(buffer) > self._stream_spill_threshold:
+                    import tempfile
+                    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+                    temp_file = os.fdopen(fd, "wb", buffering=self._stream_spill_buffer_size)
+                    temp_file.write(buffer)
+                    buffer = bytearray()
+            if temp_file is not None:
+                temp_file.close()
+                temp_file = None
+                upload = temp_path
+            else:
+                upload = io.BytesIO(buffer)
+                upload.name = filename
+
+            client = await self._get_connected_client()
+            peer = await self._get_input_peer(client)
+            sent = await self._rpc(lambda: client.send_file(peer, upload, caption=filename))
             message = sent[0] if isinstance(sent, list) and sent else sent
             actual_rel = rel
             if message:
@@ -507,10 +672,10 @@ class TelegramAdapter:
                     self._clear_message_cache()
 
         finally:
-            if os.path.exists(temp_path):
+            if temp_file is not None:
+                temp_file.close()
+            if temp_path and os.path.exists(temp_path):
                 os.remove(temp_path)
-            if client.is_connected():
-                await client.disconnect()
         return {"rel": actual_rel, "size": total_size}
 
     async def mkdir(self, root: str, rel: str):
@@ -527,18 +692,12 @@ class TelegramAdapter:
         except (ValueError, IndexError):
             raise FileNotFoundError(f"无效的文件路径格式，无法解析消息ID: {rel}")
 
-        client = self._get_client()
-        try:
-            await client.connect()
-            result = await client.delete_messages(self.chat_id, [message_id])
-            if not result or not result[0].pts:
-                 raise FileNotFoundError(f"在 {self.chat_id} 中删除消息 {message_id} 失败，可能消息不存在或无权限")
-            self._message_cache.pop(message_id, None)
-        finally:
-            if client.is_connected():
-                await client.disconnect()
-            if self._client is client:
-                self._client = None
+        client = await self._get_connected_client()
+        peer = await self._get_input_peer(client)
+        result = await self._rpc(lambda: client.delete_messages(peer, [message_id]))
+        if not result or not result[0].pts:
+             raise FileNotFoundError(f"在 {self.chat_id} 中删除消息 {message_id} 失败，可能消息不存在或无权限")
+        self._message_cache.pop(message_id, None)
 
     async def move(self, root: str, src_rel: str, dst_rel: str):
         raise NotImplementedError("Telegram 适配器不支持移动。")
@@ -584,17 +743,16 @@ class TelegramAdapter:
                 return StreamingResponse(iter(()), status_code=status, headers=headers)
 
             if range_header:
-                try:
-                    range_val = range_header.strip().partition("=")[2]
-                    s, _, e = range_val.partition("-")
-                    start = int(s) if s else 0
-                    end = int(e) if e else file_size - 1
-                    if start >= file_size or end >= file_size or start > end:
-                        raise HTTPException(status_code=416, detail="Requested Range Not Satisfiable")
-                    status = 206
-                    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-                except ValueError:
+                m = _RANGE_RE.fullmatch(range_header.strip())
+                if not m:
                     raise HTTPException(status_code=400, detail="Invalid Range header")
+                s, e = m.groups()
+                start = int(s) if s else 0
+                end = int(e) if e else file_size - 1
+                if start >= file_size or end >= file_size or start > end:
+                    raise HTTPException(status_code=416, detail="Requested Range Not Satisfiable")
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
 
             headers["Content-Length"] = str(end - start + 1)
             self._active_stream_message_id = message_id
@@ -603,14 +761,16 @@ class TelegramAdapter:
                 downloaded = 0
                 try:
                     limit = end - start + 1
+                    request_size, chunk_count = self._download_window(limit)
                     if self._active_stream_message_id != message_id:
                         return
                     async with self._download_lock:
                         async for chunk in client.iter_download(
                             media,
                             offset=start,
-                            request_size=self._download_chunk_size,
-                            chunk_size=self._download_chunk_size,
+                            limit=chunk_count,
+                            request_size=request_size,
+                            chunk_size=request_size,
                             file_size=file_size,
                         ):
                             if self._active_stream_message_id != message_id:
@@ -630,6 +790,7 @@ class TelegramAdapter:
                     if downloaded == 0:
                         raise self._flood_wait_http_exception(exc)
                     seconds = int(getattr(exc, "seconds", 0) or 0)
+                    self._rpc_bucket.penalize(seconds)
                     print(f"Telegram streaming stopped by FloodWait after partial response, wait={seconds}s")
                     return
                 except Exception:
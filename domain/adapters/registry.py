@@ -1,3 +1,4 @@
+import asyncio
 import inspect
 import pkgutil
 from importlib import import_module
@@ -76,6 +77,34 @@ def discover_adapters():
             CONFIG_SCHEMAS[adapter_type] = schema
 
 
+_CLOSING_TASKS: set[asyncio.Task] = set()
+
+
+async def _close_instance(instance: BaseAdapter) -> None:
+    """适配器实例可选的 close()：释放其持有的长连接（如 Telegram 客户端）"""
+    close = getattr(instance, "close", None)
+    if not callable(close):
+        return
+    try:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+    except Exception:
+        pass
+
+
+def _schedule_close(instance: BaseAdapter | None) -> None:
+    if instance is None or not callable(getattr(instance, "close", None)):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_close_instance(instance))
+    _CLOSING_TASKS.add(task)
+    task.add_done_callback(_CLOSING_TASKS.discard)
+
+
 def get_config_schemas() -> Dict[str, list]:
     return CONFIG_SCHEMAS
 
@@ -90,6 +119,8 @@ class RuntimeRegistry:
 
     async def refresh(self):
         discover_adapters()
+        # 旧实例全部被替换，新实例建好后关闭旧实例，避免同一会话同时保留多条长连接
+        previous = list(self._instances.values())
         self._instances.clear()
         adapters = await StorageAdapter.filter(enabled=True)
         for rec in adapters:
@@ -109,6 +140,8 @@ class RuntimeRegistry:
                 self._instances[rec.id] = factory(rec)
             except Exception:
                 continue
+        for instance in previous:
+            _schedule_close(instance)
 
     def get(self, adapter_id: int) -> BaseAdapter | None:
         return self._instances.get(adapter_id)
@@ -116,10 +149,16 @@ class RuntimeRegistry:
     def snapshot(self) -> Dict[int, BaseAdapter]:
         return dict(self._instances)
 
+    async def close_all(self):
+        """应用关闭时释放所有实例持有的连接"""
+        instances = list(self._instances.values())
+        self._instances.clear()
+        for instance in instances:
+            await _close_instance(instance)
+
     def remove(self, adapter_id: int):
         """从缓存中移除一个适配器实例"""
-        if adapter_id in self._instances:
-            del self._instances[adapter_id]
+        _schedule_close(self._instances.pop(adapter_id, None))
 
     async def upsert(self, rec: StorageAdapter):
         """新增或更新一个适配器实例"""
@@ -147,6 +186,7 @@ class RuntimeRegistry:
 
         try:
             instance = factory(rec)
+            _schedule_close(self._instances.get(rec.id))
             self._instances[rec.id] = instance
         except Exception:
             self.remove(rec.id)
@@ -3,10 +3,12 @@ from typing import Dict, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
+_TYPE_RE = re.compile(r"[a-z0-9_]+")
+
 
 class AdapterBase(BaseModel):
     name: str
-    type: str = Field(pattern=r"^[a-z0-9_]+$")
+    type: str
     config: Dict = Field(default_factory=dict)
     enabled: bool = True
     path: str = None
@@ -20,7 +22,7 @@ class AdapterBase(BaseModel):
         normalized = v.strip().lower()
         if not normalized:
             raise ValueError("type required")
-        if not re.fullmatch(r"[a-z0-9_]+", normalized):
+        if not _TYPE_RE.fullmatch(normalized):
             raise ValueError("type must be lowercase alphanumeric or underscore")
         return normalized
 
@@ -14,6 +14,7 @@ from .service import (
     DEFAULT_VECTOR_DIMENSION,
     VectorDBConfigManager,
     VectorDBService,
+    shutdown_http_client,
 )
 from .types import (
     ABILITIES,
@@ -52,6 +53,7 @@ __all__ = [
     "DEFAULT_VECTOR_DIMENSION",
     "VECTOR_COLLECTION_NAME",
     "FILE_COLLECTION_NAME",
+    "shutdown_http_client",
     "BaseVectorProvider",
     "MilvusLiteProvider",
     "MilvusServerProvider",
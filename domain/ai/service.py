@@ -1,10 +1,11 @@
 import asyncio
 import json
+import re
 from collections.abc import Iterable
 from typing import Any, Dict, List, Optional, Tuple, TypeVar
 
 import httpx
-from tortoise.exceptions import DoesNotExist
+from tortoise import timezone
 from tortoise.transactions import in_transaction
 
 from domain.config import ConfigService
@@ -30,6 +31,26 @@ OPENAI_EMBEDDING_DIMS = {
 
 T = TypeVar("T")
 
+_HTTP_CLIENT: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """同步模型列表共用一个连接池，重复同步时复用 TCP/TLS 连接"""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=128),
+        )
+    return _HTTP_CLIENT
+
+
+async def shutdown_http_client():
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
 
 class VectorDBConfigManager:
     TYPE_KEY = "VECTOR_DB_TYPE"
@@ -105,10 +126,12 @@ def _apply_embedding_dim_to_metadata(
     base_metadata: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     source = base_metadata if isinstance(base_metadata, dict) else {}
-    metadata: Dict[str, Any] = dict(source)
     override = data.get("metadata")
+    # 合并结果只分配一个新字典，不修改 base_metadata 与 override
     if isinstance(override, dict) and override:
-        metadata.update(override)
+        metadata: Dict[str, Any] = source | override
+    else:
+        metadata = dict(source)
     if embedding_dim is None:
         metadata.pop("embedding_dimensions", None)
     else:
@@ -117,41 +140,56 @@ def _apply_embedding_dim_to_metadata(
     return data
 
 
-def infer_openai_capabilities(model_id: str) -> Tuple[List[str], Optional[int]]:
-    lower = model_id.lower()
-    caps = set()
-
-    if any(keyword in lower for keyword in ["gpt", "chat", "turbo", "o1", "sonnet", "haiku", "thinking"]):
-        caps.update({"chat", "tools"})
-
-    if any(keyword in lower for keyword in ["vision", "gpt-4o", "gpt-4.1", "o1", "vision-preview", "omni"]):
-        caps.add("vision")
-
-    if any(keyword in lower for keyword in ["embed", "embedding"]):
-        caps.add("embedding")
+# 模型 ID 关键字 -> 推断出的能力；gpt-4o / gpt-4.1 本身也包含 gpt，能力已合并在内
+_OPENAI_CAPABILITY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "gpt-4o": ("chat", "tools", "vision"),
+    "gpt-4.1": ("chat", "tools", "vision"),
+    "o1": ("chat", "tools", "vision"),
+    "gpt": ("chat", "tools"),
+    "chat": ("chat", "tools"),
+    "turbo": ("chat", "tools"),
+    "sonnet": ("chat", "tools"),
+    "haiku": ("chat", "tools"),
+    "thinking": ("chat", "tools"),
+    "vision": ("vision",),
+    "omni": ("vision",),
+    "embed": ("embedding",),
+    "rerank": ("rerank",),
+    "re-rank": ("rerank",),
+    "tts": ("voice",),
+    "speech": ("voice",),
+    "audio": ("voice",),
+}
+# 长关键字优先；零宽前瞻让每个起始位置都参与匹配，一次扫描即可取出所有重叠的关键字
+_OPENAI_CAPABILITY_RE = re.compile(
+    "(?=(%s))" % "|".join(re.escape(k) for k in sorted(_OPENAI_CAPABILITY_KEYWORDS, key=len, reverse=True))
+)
 
-    if "rerank" in lower or "re-rank" in lower:
-        caps.add("rerank")
 
-    if any(keyword in lower for keyword in ["tts", "speech", "audio"]):
-        caps.add("voice")
+def infer_openai_capabilities(model_id: str) -> Tuple[List[str], Optional[int]]:
+    caps = set()
+    for keyword in _OPENAI_CAPABILITY_RE.findall(model_id.lower()):
+        caps.update(_OPENAI_CAPABILITY_KEYWORDS[keyword])
 
     embedding_dim = OPENAI_EMBEDDING_DIMS.get(model_id)
     return normalize_capabilities(caps), embedding_dim
 
 
+# Gemini supportedGenerationMethods（小写）-> 推断出的能力
+_GEMINI_METHOD_CAPABILITIES: Dict[str, Tuple[str, ...]] = {
+    "generatecontent": ("chat", "tools", "vision"),
+    "counttokens": ("chat", "tools", "vision"),
+    "embedcontent": ("embedding",),
+    "generatespeech": ("voice",),
+    "audiogeneration": ("voice",),
+    "rerank": ("rerank",),
+}
+
+
 def infer_gemini_capabilities(methods: Iterable[str]) -> List[str]:
     caps = set()
     for method in methods:
-        m = method.lower()
-        if m in {"generatecontent", "counttokens"}:
-            caps.update({"chat", "tools", "vision"})
-        if m == "embedcontent":
-            caps.add("embedding")
-        if m in {"generatespeech", "audiogeneration"}:
-            caps.add("voice")
-        if m == "rerank":
-            caps.add("rerank")
+        caps.update(_GEMINI_METHOD_CAPABILITIES.get(method.lower(), ()))
     return normalize_capabilities(caps)
 
 
@@ -171,9 +209,14 @@ def serialize_provider(provider: AIProvider) -> Dict[str, Any]:
     }
 
 
-def model_to_dict(model: AIModel, provider: Optional[AIProvider] = None) -> Dict[str, Any]:
-    provider_obj = provider or getattr(model, "provider", None)
-    provider_data = serialize_provider(provider_obj) if provider_obj else None
+def model_to_dict(
+    model: AIModel,
+    provider: Optional[AIProvider] = None,
+    provider_data: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    if provider_data is None:
+        provider_obj = provider or getattr(model, "provider", None)
+        provider_data = serialize_provider(provider_obj) if provider_obj else None
     return {
         "id": model.id,
         "provider_id": model.provider_id,
@@ -191,9 +234,12 @@ def model_to_dict(model: AIModel, provider: Optional[AIProvider] = None) -> Dict
 
 
 def provider_to_dict(provider: AIProvider, models: Optional[List[AIModel]] = None) -> Dict[str, Any]:
-    data = serialize_provider(provider)
-    if models is not None:
-        data["models"] = [model_to_dict(m, provider=provider) for m in models]
+    provider_data = serialize_provider(provider)
+    if models is None:
+        return provider_data
+    # 同一提供商下的模型共用一份序列化结果；外层另起一份，避免 models 字段引用到自身
+    data = dict(provider_data)
+    data["models"] = [model_to_dict(m, provider_data=provider_data) for m in models]
     return data
 
 
@@ -233,15 +279,15 @@ class AIProviderService:
 
     @classmethod
     async def list_models(cls, provider_id: int) -> List[Dict[str, Any]]:
-        models = await AIModel.filter(provider_id=provider_id).order_by("id").prefetch_related("provider")
+        models = await AIModel.filter(provider_id=provider_id).order_by("id").select_related("provider")
         return [model_to_dict(m) for m in models]
 
     @classmethod
     async def create_model(cls, provider_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
-        data = payload.copy()
+        data = {k: v for k, v in payload.items() if k != "embedding_dimensions"}
         data["provider_id"] = provider_id
         data["capabilities"] = normalize_capabilities(data.get("capabilities"))
-        embedding_dim = _normalize_embedding_dim(data.pop("embedding_dimensions", None))
+        embedding_dim = _normalize_embedding_dim(payload.get("embedding_dimensions"))
         data = _apply_embedding_dim_to_metadata(data, embedding_dim)
         model = await AIModel.create(**data)
         await model.fetch_related("provider")
@@ -292,34 +338,53 @@ class AIProviderService:
         provider = await AIProvider.get(id=provider_id)
         remote_models = await cls._get_remote_models(provider)
 
+        # 先一次取出该提供商已有的模型，逐条比对后在同一事务中批量插入/更新
+        existing = {m.name: m for m in await AIModel.filter(provider_id=provider.id)}
+        to_create: Dict[str, AIModel] = {}
+        to_update: Dict[str, AIModel] = {}
         created = 0
         updated = 0
         for entry in remote_models:
-            defaults = entry.copy()
-            model_id = defaults.pop("name")
+            model_id = entry["name"]
+            defaults = {k: v for k, v in entry.items() if k != "name" and k != "embedding_dimensions"}
             defaults["capabilities"] = normalize_capabilities(defaults.get("capabilities"))
-            embedding_dim = _normalize_embedding_dim(defaults.pop("embedding_dimensions", None))
+            embedding_dim = _normalize_embedding_dim(entry.get("embedding_dimensions"))
             defaults = _apply_embedding_dim_to_metadata(defaults, embedding_dim)
-            obj, is_created = await AIModel.get_or_create(
-                provider_id=provider.id,
-                name=model_id,
-                defaults=defaults,
-            )
-            if is_created:
+            obj = existing.get(model_id)
+            if obj is None:
+                obj = AIModel(provider_id=provider.id, name=model_id, **defaults)
+                existing[model_id] = to_create[model_id] = obj
                 created += 1
                 continue
             for field, value in defaults.items():
                 setattr(obj, field, value)
             if embedding_dim is not None or ("embedding_dimensions" in entry and embedding_dim is None):
                 obj.embedding_dimensions = embedding_dim
-            await obj.save()
+            if model_id not in to_create:
+                # bulk_update 不会触发 auto_now，需手动刷新更新时间
+                obj.updated_at = timezone.now()
+                to_update[model_id] = obj
             updated += 1
 
+        async with in_transaction() as connection:
+            if to_create:
+                # 并发同步时另一方可能已插入同名模型，忽略 (provider, name) 唯一约束冲突
+                await AIModel.bulk_create(
+                    list(to_create.values()), batch_size=200, ignore_conflicts=True, using_db=connection
+                )
+            if to_update:
+                await AIModel.bulk_update(
+                    list(to_update.values()),
+                    fields=["display_name", "description", "capabilities", "context_window", "metadata", "updated_at"],
+                    batch_size=200,
+                    using_db=connection,
+                )
+
         return {"created": created, "updated": updated}
 
     @classmethod
     async def get_default_models(cls) -> Dict[str, Optional[Dict[str, Any]]]:
-        defaults = await AIDefaultModel.all().prefetch_related("model__provider")
+        defaults = await AIDefaultModel.all().select_related("model__provider")
         result: Dict[str, Optional[Dict[str, Any]]] = {ability: None for ability in ABILITIES}
         for item in defaults:
             result[item.ability] = model_to_dict(item.model, provider=item.model.provider)  # type: ignore[attr-defined]
@@ -329,20 +394,39 @@ class AIProviderService:
     async def set_default_models(cls, mapping: Dict[str, Optional[int]]) -> Dict[str, Optional[Dict[str, Any]]]:
         normalized = {ability: mapping.get(ability) for ability in ABILITIES}
         async with in_transaction() as connection:
+            # 目标模型与现有默认记录各一次查询取回，其余判断在内存中完成
+            requested_ids = {model_id for model_id in normalized.values() if model_id}
+            found_ids = set()
+            if requested_ids:
+                found_ids = set(
+                    await AIModel.filter(id__in=requested_ids).using_db(connection).values_list("id", flat=True)
+                )
+            existing = {r.ability: r for r in await AIDefaultModel.filter(ability__in=ABILITIES).using_db(connection)}
+
+            to_create: List[AIDefaultModel] = []
+            to_update: List[AIDefaultModel] = []
+            to_delete: List[str] = []
             for ability, model_id in normalized.items():
-                record = await AIDefaultModel.get_or_none(ability=ability)
+                record = existing.get(ability)
                 if model_id:
-                    try:
-                        model = await AIModel.get(id=model_id)
-                    except DoesNotExist:
+                    if model_id not in found_ids:
                         raise ValueError(f"Model {model_id} not found")
-                    if record:
+                    if record is None:
+                        to_create.append(AIDefaultModel(ability=ability, model_id=model_id))
+                    elif record.model_id != model_id:
                         record.model_id = model_id
-                        await record.save(using_db=connection)
-                    else:
-                        await AIDefaultModel.create(ability=ability, model_id=model_id)
+                        # bulk_update 不会触发 auto_now，需手动刷新更新时间
+                        record.updated_at = timezone.now()
+                        to_update.append(record)
                 elif record:
-                    await record.delete(using_db=connection)
+                    to_delete.append(ability)
+
+            if to_create:
+                await AIDefaultModel.bulk_create(to_create, using_db=connection)
+            if to_update:
+                await AIDefaultModel.bulk_update(to_update, fields=["model_id", "updated_at"], using_db=connection)
+            if to_delete:
+                await AIDefaultModel.filter(ability__in=to_delete).using_db(connection).delete()
         return await cls.get_default_models()
 
     @classmethod
@@ -350,13 +434,8 @@ class AIProviderService:
         ability_key = ability.lower()
         if ability_key not in ABILITIES:
             return None
-        record = await AIDefaultModel.get_or_none(ability=ability_key)
-        if not record:
-            return None
-        model = await AIModel.get_or_none(id=record.model_id)
-        if model:
-            await model.fetch_related("provider")
-        return model
+        # 默认模型记录、模型与提供商一次 JOIN 查出
+        return await AIModel.filter(default_for__ability=ability_key).select_related("provider").first()
 
     @classmethod
     async def _fetch_openai_models(cls, provider: AIProvider) -> List[Dict[str, Any]]:
@@ -366,10 +445,10 @@ class AIProviderService:
         if provider.api_key:
             headers["Authorization"] = f"Bearer {provider.api_key}"
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            payload = response.json()
+        response = await _get_http_client().get(url, headers=headers)
+        response.raise_for_status()
+        # 直接解析响应字节，省去先整体解码成 str 的一份拷贝
+        payload = json.loads(response.content)
 
         data = payload.get("data", [])
         entries: List[Dict[str, Any]] = []
@@ -397,10 +476,9 @@ class AIProviderService:
             suffix += f"?key={provider.api_key}"
         url = f"{base_url}{suffix}"
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            payload = response.json()
+        response = await _get_http_client().get(url)
+        response.raise_for_status()
+        payload = json.loads(response.content)
 
         data = payload.get("models", [])
         entries: List[Dict[str, Any]] = []
@@ -3,6 +3,7 @@ from typing import Any, Dict, Iterable, List, Optional
 from pydantic import BaseModel, Field, field_validator
 
 ABILITIES = ["chat", "vision", "embedding", "rerank", "voice", "tools"]
+VALID_CAPABILITIES = frozenset(ABILITIES)
 OPENAI_PROTOCOL_CHAT_COMPLETIONS = "chat_completions"
 OPENAI_PROTOCOL_RESPONSES = "responses"
 OPENAI_PROTOCOLS = {OPENAI_PROTOCOL_CHAT_COMPLETIONS, OPENAI_PROTOCOL_RESPONSES}
@@ -22,13 +23,30 @@ def normalize_capabilities(items: Optional[Iterable[str]]) -> List[str]:
     if not items:
         return []
     normalized: List[str] = []
+    seen: set[str] = set()
     for cap in items:
         key = str(cap).strip().lower()
-        if key in ABILITIES and key not in normalized:
+        if key in VALID_CAPABILITIES and key not in seen:
+            seen.add(key)
             normalized.append(key)
     return normalized
 
 
+def validate_capability_list(items: Iterable[str]) -> List[str]:
+    """单次遍历完成规范化与校验，出现未知能力时报错"""
+    normalized: List[str] = []
+    invalid: List[str] = []
+    for cap in items:
+        key = str(cap).strip().lower()
+        if key not in VALID_CAPABILITIES:
+            invalid.append(str(cap))
+        elif key not in normalized:
+            normalized.append(key)
+    if invalid:
+        raise ValueError(f"Unsupported capabilities: {', '.join(invalid)}")
+    return normalized
+
+
 def normalize_openai_protocol(value: Any) -> str:
     if value is None:
         return OPENAI_PROTOCOL_CHAT_COMPLETIONS
@@ -124,11 +142,7 @@ class AIModelBase(BaseModel):
     def validate_capabilities(cls, items: Optional[List[str]]) -> Optional[List[str]]:
         if items is None:
             return None
-        normalized = normalize_capabilities(items)
-        invalid = set(items) - set(normalized)
-        if invalid:
-            raise ValueError(f"Unsupported capabilities: {', '.join(invalid)}")
-        return normalized
+        return validate_capability_list(items)
 
 
 class AIModelCreate(AIModelBase):
@@ -148,11 +162,7 @@ class AIModelUpdate(BaseModel):
     def validate_capabilities(cls, items: Optional[List[str]]) -> Optional[List[str]]:
         if items is None:
             return None
-        normalized = normalize_capabilities(items)
-        invalid = set(items) - set(normalized)
-        if invalid:
-            raise ValueError(f"Unsupported capabilities: {', '.join(invalid)}")
-        return normalized
+        return validate_capability_list(items)
 
 
 class AIDefaultsUpdate(BaseModel):
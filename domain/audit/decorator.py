@@ -135,9 +135,12 @@ def audit(
     user_kw: str = "current_user",
 ):
     def decorator(func):
+        # 签名在装饰时解析一次，每次请求只做参数绑定
+        signature = inspect.signature(func)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            bound = inspect.signature(func).bind_partial(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs)
             bound.apply_defaults()
             request = _extract_request(bound.arguments)
             start = time.perf_counter()
@@ -49,17 +49,23 @@ class PathMatcher:
         else:
             return cls._match_glob(path, pattern)
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _compile_regex(pattern: str) -> re.Pattern | None:
+        """编译并缓存规则中的正则，非法表达式缓存为 None"""
+        try:
+            return re.compile(pattern)
+        except re.error:
+            return None
+
     @classmethod
     def _match_regex(cls, path: str, pattern: str) -> bool:
         """正则表达式匹配"""
-        try:
-            # 限制正则表达式的复杂度，防止 ReDoS 攻击
-            if len(pattern) > 500:
-                return False
-            regex = re.compile(pattern)
-            return bool(regex.match(path))
-        except re.error:
+        # 限制正则表达式的复杂度，防止 ReDoS 攻击
+        if len(pattern) > 500:
             return False
+        regex = cls._compile_regex(pattern)
+        return bool(regex and regex.match(path))
 
     @classmethod
     def _match_glob(cls, path: str, pattern: str) -> bool:
@@ -122,10 +128,8 @@ class PathMatcher:
 
         # 多个 ** 的情况，使用简化匹配
         regex_pattern = pattern.replace("**", ".*").replace("*", "[^/]*").replace("?", ".")
-        try:
-            return bool(re.match(f"^{regex_pattern}$", path))
-        except re.error:
-            return False
+        regex = cls._compile_regex(f"^{regex_pattern}$")
+        return bool(regex and regex.match(path))
 
     @classmethod
     def get_pattern_specificity(cls, pattern: str, is_regex: bool = False) -> int:
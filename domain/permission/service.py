@@ -23,6 +23,7 @@ class PermissionContext:
     exists: bool
     is_admin: bool
     path_rules: List[PathRule]
+    permissions: frozenset[str] = frozenset()
 
 
 class PermissionService:
@@ -102,18 +103,16 @@ class PermissionService:
             cls._context_cache[user_id] = (context, cls._now())
             return context
 
-        user_roles = await UserRole.filter(user_id=user_id)
-        role_ids = [ur.role_id for ur in user_roles]
-        if not role_ids:
-            context = PermissionContext(exists=True, is_admin=False, path_rules=[])
-            cls._context_cache[user_id] = (context, cls._now())
-            return context
-
-        path_rules = await PathRule.filter(role_id__in=role_ids)
+        # 通过 user_roles 关联直接取规则与权限码，不再先单独查询角色列表
+        path_rules = await PathRule.filter(role__role_users__user_id=user_id)
+        permission_codes = await RolePermission.filter(
+            role__role_users__user_id=user_id
+        ).values_list("permission_code", flat=True)
         context = PermissionContext(
             exists=True,
             is_admin=False,
             path_rules=cls._sort_path_rules(list(path_rules)),
+            permissions=frozenset(permission_codes),
         )
         cls._context_cache[user_id] = (context, cls._now())
         return context
@@ -198,27 +197,16 @@ class PermissionService:
     @classmethod
     async def check_system_permission(cls, user_id: int, permission_code: str) -> bool:
         """检查用户的系统/适配器权限"""
-        # 获取用户
-        user = await UserAccount.get_or_none(id=user_id)
-        if not user:
+        # 权限码集合随权限上下文一起缓存，角色或权限变更时由 clear_cache 失效
+        context = await cls._get_permission_context(user_id)
+        if not context.exists:
             return False
 
         # 超级管理员直接放行
-        if user.is_admin:
+        if context.is_admin:
             return True
 
-        # 获取用户所有角色
-        user_roles = await UserRole.filter(user_id=user_id)
-        role_ids = [ur.role_id for ur in user_roles]
-
-        if not role_ids:
-            return False
-
-        role_permission = await RolePermission.filter(
-            role_id__in=role_ids, permission_code=permission_code
-        ).first()
-
-        return role_permission is not None
+        return permission_code in context.permissions
 
     @classmethod
     async def require_path_permission(
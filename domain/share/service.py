@@ -73,7 +73,7 @@ class ShareService:
 
     @classmethod
     async def get_share_by_token(cls, token: str) -> ShareLink:
-        share = await ShareLink.get_or_none(token=token).prefetch_related("user")
+        share = await ShareLink.filter(token=token).select_related("user").first()
         if not share:
             raise HTTPException(status_code=404, detail="分享链接不存在")
 
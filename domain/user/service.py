@@ -31,18 +31,15 @@ class UserService:
 
     @classmethod
     async def get_user(cls, user_id: int) -> UserDetail:
-        user = await UserAccount.get_or_none(id=user_id).prefetch_related("created_by")
+        user = await UserAccount.filter(id=user_id).select_related("created_by").first()
         if not user:
             raise HTTPException(404, detail="用户不存在")
 
-        user_roles = await UserRole.filter(user_id=user_id).prefetch_related("role")
+        user_roles = await UserRole.filter(user_id=user_id).select_related("role")
         roles = [ur.role.name for ur in user_roles]
 
-        created_by_username = None
-        if user.created_by_id:
-            creator = await UserAccount.get_or_none(id=user.created_by_id)
-            if creator:
-                created_by_username = creator.username
+        creator = user.created_by if user.created_by_id else None
+        created_by_username = creator.username if creator else None
 
         return UserDetail(
             id=user.id,
@@ -63,7 +60,7 @@ class UserService:
         if not role:
             raise HTTPException(404, detail="角色不存在")
 
-        user_roles = await UserRole.filter(role_id=role_id).prefetch_related("user")
+        user_roles = await UserRole.filter(role_id=role_id).select_related("user")
         users = [ur.user for ur in user_roles if ur.user]
         users.sort(key=lambda u: u.id)
         return [
@@ -185,6 +182,6 @@ class UserService:
         await UserRole.filter(user_id=user_id, role_id=role_id).delete()
         PermissionService.clear_cache(user_id)
 
-        user_roles = await UserRole.filter(user_id=user_id).prefetch_related("role")
+        user_roles = await UserRole.filter(user_id=user_id).select_related("role")
         return [ur.role.name for ur in user_roles]
 
@@ -41,7 +41,7 @@ class VideoRoomService:
 
     @classmethod
     async def get_room_by_token(cls, token: str) -> VideoRoom:
-        room = await VideoRoom.get_or_none(token=token).prefetch_related("user")
+        room = await VideoRoom.filter(token=token).select_related("user").first()
         if not room:
             raise HTTPException(status_code=404, detail="视频房不存在")
         return room
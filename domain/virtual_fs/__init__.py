@@ -1,4 +1,5 @@
 from .service import VirtualFSService
+from .thumbnail import shutdown_thumb_pool
 from .types import DirListing, MkdirRequest, MoveRequest, SearchResultItem, VfsEntry
 
 __all__ = [
@@ -8,4 +9,5 @@ __all__ = [
     "MoveRequest",
     "SearchResultItem",
     "VfsEntry",
+    "shutdown_thumb_pool",
 ]
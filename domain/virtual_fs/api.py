@@ -21,7 +21,11 @@ async def get_file(
     request: Request,
     current_user: Annotated[User, Depends(get_current_active_user)],
 ):
-    return await VirtualFSService.serve_file(full_path, request.headers.get("Range"))
+    return await VirtualFSService.serve_file(
+        full_path,
+        request.headers.get("Range"),
+        request.headers.get("If-None-Match"),
+    )
 
 
 @router.get("/thumb/{full_path:path}")
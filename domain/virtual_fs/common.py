@@ -1,12 +1,21 @@
+import hashlib
+from email.utils import formatdate
 from pathlib import Path
 from typing import Any
 
 from fastapi import HTTPException
 
+from domain.config import ConfigService
+
 
 class VirtualFSCommonMixin:
     CROSS_TRANSFER_TEMP_ROOT = Path("data/tmp/cross_transfer")
     DIRECT_REDIRECT_CONFIG_KEY = "enable_direct_download_307"
+    WALK_PAGE_SIZE_CONFIG_KEY = "FOXEL_WALK_PAGE_SIZE"
+    DEFAULT_WALK_PAGE_SIZE = 5000
+    THUMB_PREWARM_CONFIG_KEY = "FOXEL_THUMB_PREWARM"
+    # 与前端文件列表请求的缩略图参数一致
+    THUMB_PREWARM_SIZE = (256, 256, "cover")
 
     @staticmethod
     def _normalize_path(path: str) -> str:
@@ -35,8 +44,45 @@ class VirtualFSCommonMixin:
         return rel.rsplit("/", 1)[0]
 
     @staticmethod
-    async def _ensure_method(adapter: Any, method: str):
+    def _validator_headers(full_path: str, stat: dict | None, variant: str = "") -> dict:
+        """由路径和 stat 的 mtime/size 生成 ETag 与 Last-Modified；同一资源的各个出口必须共用，保证校验值一致"""
+        if not isinstance(stat, dict):
+            return {}
+        mtime = stat.get("mtime")
+        size = stat.get("size")
+        if not mtime and not size:
+            return {}
+        digest = hashlib.blake2b(f"{full_path}:{mtime}:{size}:{variant}".encode(), digest_size=16).hexdigest()
+        headers = {"ETag": f'"{digest}"'}
+        try:
+            if mtime:
+                headers["Last-Modified"] = formatdate(float(mtime), usegmt=True)
+        except (TypeError, ValueError):
+            pass
+        return headers
+
+    @staticmethod
+    def _adapter_method(adapter: Any, method: str):
+        """取适配器实例上的方法，不存在或不可调用时返回 None"""
         func = getattr(adapter, method, None)
-        if not callable(func):
+        return func if callable(func) else None
+
+    @classmethod
+    async def _ensure_method(cls, adapter: Any, method: str):
+        func = cls._adapter_method(adapter, method)
+        if func is None:
             raise HTTPException(501, detail=f"Adapter does not implement {method}")
         return func
+
+    @classmethod
+    async def _walk_page_size(cls, adapter: Any) -> int:
+        """递归遍历目录时每页请求的条目数，受适配器声明的 max_page_size 限制"""
+        raw = await ConfigService.get(cls.WALK_PAGE_SIZE_CONFIG_KEY, cls.DEFAULT_WALK_PAGE_SIZE)
+        try:
+            size = int(raw)
+        except (TypeError, ValueError):
+            size = cls.DEFAULT_WALK_PAGE_SIZE
+        limit = getattr(adapter, "max_page_size", None)
+        if isinstance(limit, int) and limit > 0:
+            size = min(size, limit)
+        return max(1, size)
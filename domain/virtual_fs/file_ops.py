@@ -1,11 +1,12 @@
 import mimetypes
+from pathlib import Path
 from typing import Any, AsyncIterator, Union
 
 from fastapi import HTTPException
 from fastapi.responses import Response
 
 from domain.tasks import TaskService
-from .thumbnail import is_raw_filename, raw_bytes_to_jpeg
+from .thumbnail import RAW_JPEG_QUALITY, get_or_create_raw_jpeg, is_raw_filename
 
 from .listing import VirtualFSListingMixin
 
@@ -42,6 +43,32 @@ class VirtualFSFileOpsMixin(VirtualFSListingMixin):
         read_func = await cls._ensure_method(adapter_instance, "read_file")
         return await read_func(root, rel)
 
+    @classmethod
+    async def open_read_stream(cls, path: str) -> AsyncIterator[bytes]:
+        """按块读取文件内容；适配器没有可迭代的 stream_file 时退回整块 read_file"""
+        adapter_instance, _, root, rel = await cls.resolve_adapter_and_rel(path)
+        if rel.endswith("/") or rel == "":
+            raise HTTPException(400, detail="Path is a directory")
+        stream_impl = getattr(adapter_instance, "stream_file", None)
+        response = await stream_impl(root, rel, None) if callable(stream_impl) else None
+        iterator = getattr(response, "body_iterator", None)
+        if iterator is None:
+            body = getattr(response, "body", None)
+            if body is not None and getattr(response, "status_code", 200) < 300:
+                yield bytes(body)
+                return
+            read_func = await cls._ensure_method(adapter_instance, "read_file")
+            yield await read_func(root, rel)
+            return
+        try:
+            async for chunk in iterator:
+                if chunk:
+                    yield chunk
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if callable(aclose):
+                await aclose()
+
     @classmethod
     async def write_file(cls, path: str, data: bytes):
         adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(path)
@@ -53,11 +80,8 @@ class VirtualFSFileOpsMixin(VirtualFSListingMixin):
         await TaskService.trigger_tasks("file_written", final_path)
         return {"path": final_path, "size": size}
 
-    @classmethod
-    async def write_file_stream(cls, path: str, data_iter: AsyncIterator[bytes], overwrite: bool = True):
-        adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(path)
-        if rel.endswith("/"):
-            raise HTTPException(400, detail="Invalid file path")
+    @staticmethod
+    async def _ensure_overwrite_allowed(adapter_instance: Any, root: str, rel: str, overwrite: bool):
         exists_func = getattr(adapter_instance, "exists", None)
         if not overwrite and callable(exists_func):
             try:
@@ -68,6 +92,13 @@ class VirtualFSFileOpsMixin(VirtualFSListingMixin):
             except Exception:
                 pass
 
+    @classmethod
+    async def write_file_stream(cls, path: str, data_iter: AsyncIterator[bytes], overwrite: bool = True):
+        adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(path)
+        if rel.endswith("/"):
+            raise HTTPException(400, detail="Invalid file path")
+        await cls._ensure_overwrite_allowed(adapter_instance, root, rel, overwrite)
+
         size = 0
         stream_func = getattr(adapter_instance, "write_file_stream", None)
         if callable(stream_func):
@@ -89,6 +120,40 @@ class VirtualFSFileOpsMixin(VirtualFSListingMixin):
         await TaskService.trigger_tasks("file_written", final_path)
         return {"path": final_path, "size": size}
 
+    @classmethod
+    async def import_temp_file(cls, path: str, temp_path: Path, overwrite: bool = True):
+        """适配器支持时直接把本地临时文件移入目标位置；不支持返回 None，由调用方走流式写入"""
+        adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(path)
+        import_func = getattr(adapter_instance, "import_local_file", None)
+        if not callable(import_func):
+            return None
+        if rel.endswith("/"):
+            raise HTTPException(400, detail="Invalid file path")
+        await cls._ensure_overwrite_allowed(adapter_instance, root, rel, overwrite)
+
+        result = await import_func(root, rel, temp_path)
+        size = int(result or 0) if not isinstance(result, dict) else 0
+        final_path, size = cls._normalize_written_result(path, adapter_model, result, size)
+        await TaskService.trigger_tasks("file_written", final_path)
+        return {"path": final_path, "size": size}
+
+    @classmethod
+    async def copy_from_local_file(cls, path: str, src_path: Path, overwrite: bool = True):
+        """适配器支持时把本机文件直接复制到目标位置（内核态复制）；不支持返回 None"""
+        adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(path)
+        copy_func = cls._adapter_method(adapter_instance, "copy_local_file")
+        if copy_func is None:
+            return None
+        if rel.endswith("/"):
+            raise HTTPException(400, detail="Invalid file path")
+        await cls._ensure_overwrite_allowed(adapter_instance, root, rel, overwrite)
+
+        result = await copy_func(root, rel, src_path)
+        size = int(result or 0) if not isinstance(result, dict) else 0
+        final_path, size = cls._normalize_written_result(path, adapter_model, result, size)
+        await TaskService.trigger_tasks("file_written", final_path)
+        return {"path": final_path, "size": size}
+
     @classmethod
     async def make_dir(cls, path: str):
         adapter_instance, _, root, rel = await cls.resolve_adapter_and_rel(path)
@@ -113,9 +178,13 @@ class VirtualFSFileOpsMixin(VirtualFSListingMixin):
             raise HTTPException(400, detail="Path is a directory")
         if is_raw_filename(rel):
             try:
-                raw_data = await cls.read_file(path)
-                content = raw_bytes_to_jpeg(raw_data, filename=rel)
-                return Response(content=content, media_type="image/jpeg")
+                stat = await adapter_instance.stat_file(root, rel)
+                content, _ = await get_or_create_raw_jpeg(adapter_instance, adapter_model.id, root, rel, stat=stat)
+                validators = cls._validator_headers(
+                    cls._normalize_path(path), stat, f"raw_jpeg_q{RAW_JPEG_QUALITY}"
+                )
+                headers = {**validators, "Cache-Control": "public, max-age=86400"}
+                return Response(content=content, media_type="image/jpeg", headers=headers)
             except Exception as exc:
                 raise HTTPException(500, detail=f"RAW file processing failed: {exc}")
 
@@ -6,9 +6,10 @@ from fastapi import HTTPException
 from api.response import page
 from domain.adapters import runtime_registry
 from domain.ai import FILE_COLLECTION_NAME, VECTOR_COLLECTION_NAME, VectorDBService
+from domain.config import ConfigService
 from domain.permission.service import PermissionService
 from domain.permission.types import PathAction
-from .thumbnail import is_image_filename, is_video_filename
+from .thumbnail import classify_filename, schedule_bulk_warm
 from models import StorageAdapter
 
 from .resolver import VirtualFSResolverMixin
@@ -49,6 +50,22 @@ class VirtualFSListingMixin(VirtualFSResolverMixin):
             return bool(info.get("is_dir"))
         return False
 
+    @classmethod
+    async def _schedule_thumbnail_prewarm(
+        cls, adapter_instance, adapter_id: int, root: str, rel: str, entries: List[Dict]
+    ) -> None:
+        flag = str(await ConfigService.get(cls.THUMB_PREWARM_CONFIG_KEY, "0") or "").strip().lower()
+        if flag not in ("1", "true", "yes", "on"):
+            return
+        targets = [
+            (cls._join_rel(rel, str(ent["name"])), int(ent.get("size") or 0), int(ent.get("mtime") or 0))
+            for ent in entries
+            if not ent.get("is_dir") and ent.get("has_thumbnail") and ent.get("name")
+        ]
+        if targets:
+            w, h, fit = cls.THUMB_PREWARM_SIZE
+            schedule_bulk_warm(adapter_instance, adapter_id, root, targets, w, h, fit)
+
     @classmethod
     async def list_virtual_dir(
         cls,
@@ -94,12 +111,12 @@ class VirtualFSListingMixin(VirtualFSResolverMixin):
                     entry["has_thumbnail"] = bool(entry.get("has_thumbnail"))
                     return
                 name = entry.get("name", "")
-                entry["has_thumbnail"] = bool(is_image_filename(name) or is_video_filename(name))
+                entry["has_thumbnail"] = classify_filename(name) != "other"
             else:
                 entry["has_thumbnail"] = False
 
         try:
-            adapter_model, rel = await cls.resolve_adapter_by_path(norm)
+            adapter_model, rel = await cls._resolve_adapter_by_norm_path(norm)
             adapter_instance = runtime_registry.get(adapter_model.id)
             if not adapter_instance:
                 await runtime_registry.refresh()
@@ -201,11 +218,19 @@ class VirtualFSListingMixin(VirtualFSResolverMixin):
             start_idx = (page_num - 1) * page_size
             end_idx = start_idx + page_size
             page_entries = combined_entries[start_idx:end_idx]
+            if adapter_model and adapter_instance:
+                await cls._schedule_thumbnail_prewarm(
+                    adapter_instance, adapter_model.id, effective_root, rel, page_entries
+                )
             return page(page_entries, total_entries, page_num, page_size)
 
         annotate_entry_list = adapter_entries_page or []
         for ent in annotate_entry_list:
             annotate_entry(ent)
+        if adapter_model and adapter_instance and annotate_entry_list:
+            await cls._schedule_thumbnail_prewarm(
+                adapter_instance, adapter_model.id, effective_root, rel, annotate_entry_list
+            )
         if adapter_listing and adapter_listing.get("pagination_mode") == "cursor":
             adapter_listing["items"] = annotate_entry_list
             return adapter_listing
@@ -299,7 +324,7 @@ class VirtualFSListingMixin(VirtualFSResolverMixin):
             if not is_dir and info.get("has_thumbnail") is not None:
                 info["has_thumbnail"] = bool(info.get("has_thumbnail"))
             else:
-                info["has_thumbnail"] = bool(not is_dir and (is_image_filename(name_hint) or is_video_filename(name_hint)))
+                info["has_thumbnail"] = bool(not is_dir and classify_filename(name_hint) != "other")
             if verbose and not is_dir:
                 vector_index = await cls._gather_vector_index(path)
                 if vector_index is not None:
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import datetime as dt
 import hashlib
@@ -6,6 +7,7 @@ import json
 import os
 import re
 import shutil
+import time
 import uuid
 import xml.etree.ElementTree as ET
 from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
@@ -397,6 +399,8 @@ def _apply_pagination(entries: List[Tuple[str, Dict]], prefixes: List[str], max_
 
 def _format_contents(entries: List[Tuple[str, Dict]]) -> str:
     blocks = []
+    # 直接用 time.gmtime + strftime 格式化，不为每个条目构造 datetime；缺失 mtime 时统一取本次列举的时间
+    now = int(time.time())
     for key, meta in entries:
         size = int(meta.get("size", 0))
         mtime = meta.get("mtime")
@@ -407,7 +411,7 @@ def _format_contents(entries: List[Tuple[str, Dict]]) -> str:
                 mtime_val = 0
         else:
             mtime_val = 0
-        last_modified = dt.datetime.utcfromtimestamp(mtime_val or dt.datetime.utcnow().timestamp()).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        last_modified = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(mtime_val or now))
         etag = _etag(key, size, mtime_val)
         blocks.append(
             f"<Contents><Key>{key}</Key><LastModified>{last_modified}</LastModified><ETag>{etag}</ETag><Size>{size}</Size><StorageClass>STANDARD</StorageClass></Contents>"
@@ -440,6 +444,14 @@ def _mpu_dir(upload_id: str) -> str:
     return os.path.join(_MPU_ROOT, upload_id)
 
 
+def _remove_mpu_dir(upload_id: str) -> None:
+    dir_path = _mpu_dir(upload_id)
+    shutil.rmtree(dir_path, ignore_errors=True)
+    prefix = dir_path + os.sep
+    for path in [p for p in _JSON_CACHE if p.startswith(prefix)]:
+        del _JSON_CACHE[path]
+
+
 def _mpu_meta_path(upload_id: str) -> str:
     return os.path.join(_mpu_dir(upload_id), _MPU_META_NAME)
 
@@ -452,12 +464,32 @@ def _mpu_part_meta_path(upload_id: str, part_number: int) -> str:
     return os.path.join(_mpu_dir(upload_id), _MPU_PART_META_TMPL.format(part_number=part_number))
 
 
+# 元数据文件路径 -> (mtime_ns, 解析结果)；文件被改写后 mtime 变化即重新解析
+_JSON_CACHE: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+# 列举分片/上传时会 gather 大量读取，限制同时打开的元数据文件数，避免占满线程池与文件句柄
+_JSON_READ_SLOTS = asyncio.Semaphore(64)
+
+
 async def _read_json(path: str) -> Optional[Dict[str, Any]]:
     try:
-        async with aiofiles.open(path, "r", encoding="utf-8") as f:
-            raw = await f.read()
-        data = json.loads(raw or "{}")
-        return data if isinstance(data, dict) else None
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        _JSON_CACHE.pop(path, None)
+        return None
+    cached = _JSON_CACHE.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        # 调用方会在结果上 setdefault，返回副本避免污染缓存
+        return dict(cached[1])
+    try:
+        # json.loads 直接接受 UTF-8 字节，省去文本模式的解码层
+        async with _JSON_READ_SLOTS:
+            async with aiofiles.open(path, "rb") as f:
+                raw = await f.read()
+        data = json.loads(raw or b"{}")
+        if not isinstance(data, dict):
+            return None
+        _JSON_CACHE[path] = (mtime_ns, data)
+        return dict(data)
     except FileNotFoundError:
         return None
     except Exception:
@@ -465,6 +497,7 @@ async def _read_json(path: str) -> Optional[Dict[str, Any]]:
 
 
 async def _write_json(path: str, data: Dict[str, Any]) -> None:
+    _JSON_CACHE.pop(path, None)
     os.makedirs(os.path.dirname(path), exist_ok=True)
     async with aiofiles.open(path, "w", encoding="utf-8") as f:
         await f.write(json.dumps(data, ensure_ascii=False))
@@ -579,16 +612,18 @@ async def _list_parts(request: Request, settings: S3Settings, bucket: str, key:
     dir_path = _mpu_dir(safe_id)
     part_metas: List[Dict[str, Any]] = []
     try:
-        filenames = os.listdir(dir_path)
+        filenames = await asyncio.to_thread(os.listdir, dir_path)
     except FileNotFoundError:
         filenames = []
 
+    part_numbers: List[int] = []
     for name in filenames:
         m = _MPU_PART_META_RE.match(name)
-        if not m:
-            continue
-        pn = int(m.group(1))
-        info = await _read_json(os.path.join(dir_path, name))
+        if m:
+            part_numbers.append(int(m.group(1)))
+    # 各分片元数据互不依赖，并发读取让文件 IO 重叠
+    infos = await asyncio.gather(*(_read_json(_mpu_part_meta_path(safe_id, pn)) for pn in part_numbers))
+    for pn, info in zip(part_numbers, infos):
         if not info:
             continue
         info.setdefault("PartNumber", pn)
@@ -638,7 +673,7 @@ async def _abort_multipart_upload(bucket: str, key: str, upload_id: Optional[str
         return err
     safe_id = _safe_upload_id(upload_id)
     assert safe_id
-    shutil.rmtree(_mpu_dir(safe_id), ignore_errors=True)
+    _remove_mpu_dir(safe_id)
     _, headers = _meta_headers()
     return Response(status_code=204, headers=headers)
 
@@ -684,8 +719,8 @@ async def _complete_multipart_upload(request: Request, settings: S3Settings, buc
         return _s3_error("MalformedXML", "CompleteMultipartUpload parts missing.", _resource_path(bucket, key), status=400)
 
     part_metas: List[Dict[str, Any]] = []
-    for pn, _etag in parts_req:
-        info = await _read_json(_mpu_part_meta_path(safe_id, pn))
+    infos = await asyncio.gather(*(_read_json(_mpu_part_meta_path(safe_id, pn)) for pn, _etag in parts_req))
+    for (pn, _etag), info in zip(parts_req, infos):
         if not info:
             return _s3_error("InvalidPart", "One or more of the specified parts could not be found.", _resource_path(bucket, key), status=400)
         info.setdefault("PartNumber", pn)
@@ -718,7 +753,7 @@ async def _complete_multipart_upload(request: Request, settings: S3Settings, buc
         digest = hashlib.md5(bytes(md5_bytes)).hexdigest() if md5_bytes else hashlib.md5(b"").hexdigest()
         etag = '"' + f"{digest}-{len(part_metas)}" + '"'
 
-    shutil.rmtree(_mpu_dir(safe_id), ignore_errors=True)
+    _remove_mpu_dir(safe_id)
 
     _, headers = _meta_headers()
     headers.update({"Content-Type": "application/xml", "ETag": etag})
@@ -744,32 +779,26 @@ async def _list_multipart_uploads(request: Request, settings: S3Settings, bucket
 
     uploads: List[Tuple[str, str, str]] = []
     try:
-        ids = os.listdir(_MPU_ROOT)
+        ids = await asyncio.to_thread(os.listdir, _MPU_ROOT)
     except FileNotFoundError:
         ids = []
 
-    for uid in ids:
-        safe_id = _safe_upload_id(uid)
-        if not safe_id:
-            continue
-        meta = await _read_json(_mpu_meta_path(safe_id))
-        if not meta:
-            continue
-        if meta.get("bucket") != bucket:
+    safe_ids = [safe_id for safe_id in map(_safe_upload_id, ids) if safe_id]
+    metas = await asyncio.gather(*(_read_json(_mpu_meta_path(safe_id)) for safe_id in safe_ids))
+    for safe_id, meta in zip(safe_ids, metas):
+        # 先做廉价的筛选，落在分页标记之前的上传不再生成条目
+        if not meta or meta.get("bucket") != bucket:
             continue
         key = str(meta.get("key") or "")
         if prefix and not key.startswith(prefix):
             continue
+        if key_marker and (key < key_marker or (key == key_marker and safe_id <= upload_id_marker)):
+            continue
         initiated = str(meta.get("initiated") or _now_iso())
         uploads.append((key, safe_id, initiated))
 
-    uploads.sort(key=lambda item: (item[0], item[1]))
-    if key_marker:
-        uploads = [
-            it
-            for it in uploads
-            if (it[0] > key_marker) or (it[0] == key_marker and it[1] > upload_id_marker)
-        ]
+    # (key, upload_id) 唯一，元组自然序即为目标顺序
+    uploads.sort()
 
     is_truncated = len(uploads) > max_uploads
     shown = uploads[:max_uploads]
@@ -60,16 +60,13 @@ class VirtualFSProcessingMixin(VirtualFSTransferMixin):
             list_dir = await cls._ensure_method(adapter_instance, "list_dir")
             processed_count = 0
             stack: list[str] = [rel]
-            page_size = 200
+            page_size = await cls._walk_page_size(adapter_instance)
 
             while stack:
                 current = stack.pop()
                 page = 1
                 while True:
                     entries, total = await list_dir(root, current, page, page_size, "name", "asc")
-                    if not entries and (total or 0) == 0:
-                        break
-
                     for entry in entries:
                         name = entry.get("name")
                         if not name:
@@ -90,7 +87,8 @@ class VirtualFSProcessingMixin(VirtualFSTransferMixin):
                             await cls.write_file(absolute_path, result_bytes)
                         processed_count += 1
 
-                    if total is None or page * page_size >= total:
+                    # 短页即最后一页；total 缺失时继续翻页，直到出现短页
+                    if len(entries) < page_size or (total is not None and page * page_size >= total):
                         break
                     page += 1
 
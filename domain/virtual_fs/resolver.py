@@ -12,7 +12,11 @@ from .common import VirtualFSCommonMixin
 class VirtualFSResolverMixin(VirtualFSCommonMixin):
     @classmethod
     async def resolve_adapter_by_path(cls, path: str) -> Tuple[StorageAdapter, str]:
-        norm = cls._normalize_path(path)
+        return await cls._resolve_adapter_by_norm_path(cls._normalize_path(path))
+
+    @classmethod
+    async def _resolve_adapter_by_norm_path(cls, norm: str) -> Tuple[StorageAdapter, str]:
+        """norm 须已经过 _normalize_path，内部调用链上避免重复规范化"""
         adapters = await StorageAdapter.filter(enabled=True)
         best = None
         for adapter in adapters:
@@ -27,7 +31,7 @@ class VirtualFSResolverMixin(VirtualFSCommonMixin):
     @classmethod
     async def resolve_adapter_and_rel(cls, path: str):
         norm = cls._normalize_path(path)
-        adapter_model, rel = await cls.resolve_adapter_by_path(norm)
+        adapter_model, rel = await cls._resolve_adapter_by_norm_path(norm)
         adapter_instance = runtime_registry.get(adapter_model.id)
         if not adapter_instance:
             await runtime_registry.refresh()
@@ -1,5 +1,7 @@
 import mimetypes
+import os
 import re
+from functools import lru_cache
 from urllib.parse import quote
 
 from fastapi import HTTPException, Request, UploadFile
@@ -8,49 +10,108 @@ from fastapi.responses import Response
 from domain.config import ConfigService
 from domain.tasks import TaskService
 from .thumbnail import (
+    RAW_JPEG_QUALITY,
+    get_or_create_raw_jpeg,
+    classify_filename,
     get_or_create_thumb,
-    is_image_filename,
     is_raw_filename,
-    is_video_filename,
-    raw_bytes_to_jpeg,
 )
 
 from .temp_link import VirtualFSTempLinkMixin
 
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+@lru_cache(maxsize=4096)
+def _guess_mime(ext: str) -> str:
+    return mimetypes.guess_type(f"file{ext}")[0] or "application/octet-stream"
+
+
+def _etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _not_modified(validators: dict) -> Response:
+    return Response(status_code=304, headers={**validators, "Cache-Control": "public, max-age=3600"})
+
 
 class VirtualFSRouteMixin(VirtualFSTempLinkMixin):
     @classmethod
-    async def serve_file(cls, full_path: str, range_header: str | None) -> Response:
+    async def serve_file(
+        cls, full_path: str, range_header: str | None, if_none_match: str | None = None
+    ) -> Response:
         full_path = cls._normalize_path(full_path)
 
+        adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(full_path)
+        if not rel or rel.endswith("/"):
+            raise HTTPException(400, detail="Path is a directory")
+
         if is_raw_filename(full_path):
             try:
-                raw_data = await cls.read_file(full_path)
-                content = raw_bytes_to_jpeg(raw_data, filename=full_path)
-                return Response(content=content, media_type="image/jpeg")
+                stat = await adapter_instance.stat_file(root, rel)
+                validators = cls._validator_headers(full_path, stat, f"raw_jpeg_q{RAW_JPEG_QUALITY}")
+                if _etag_matches(if_none_match, validators.get("ETag")):
+                    return _not_modified(validators)
+                content, _ = await get_or_create_raw_jpeg(adapter_instance, adapter_model.id, root, rel, stat=stat)
             except FileNotFoundError:
                 raise HTTPException(404, detail="File not found")
+            except HTTPException:
+                raise
             except Exception as exc:
                 raise HTTPException(500, detail=f"RAW file processing failed: {exc}")
+            headers = {**validators, "Cache-Control": "public, max-age=86400"}
+            return Response(content=content, media_type="image/jpeg", headers=headers)
 
-        adapter_instance, adapter_model, root, rel = await cls.resolve_adapter_and_rel(full_path)
         redirect_response = await cls.maybe_redirect_download(adapter_instance, adapter_model, root, rel)
         if redirect_response is not None:
             return redirect_response
 
+        validators: dict = {}
+        stat_func = getattr(adapter_instance, "stat_file", None)
+        stream_impl = getattr(adapter_instance, "stream_file", None)
+        streamed_range = bool(range_header) and callable(stream_impl)
+        # 远程适配器上 stat 是一次额外的后端往返：Range 流式请求（播放器拖动进度）只在带 If-None-Match 时才查询；
+        # 完整下载本身要读全文件，顺带 stat 一次以下发 ETag 供后续条件请求使用
+        if callable(stat_func) and (if_none_match or not streamed_range):
+            try:
+                validators = cls._validator_headers(full_path, await stat_func(root, rel))
+            except FileNotFoundError:
+                raise HTTPException(404, detail="File not found")
+            except HTTPException as exc:
+                if exc.status_code == 404:
+                    raise
+            except Exception:
+                validators = {}
+        if _etag_matches(if_none_match, validators.get("ETag")):
+            return _not_modified(validators)
+
+        if streamed_range:
+            try:
+                response = await stream_impl(root, rel, range_header)
+            except FileNotFoundError:
+                raise HTTPException(404, detail="File not found")
+            if isinstance(response, Response):
+                for name, value in validators.items():
+                    response.headers.setdefault(name, value)
+            return response
+
         try:
             content = await cls.read_file(full_path)
         except FileNotFoundError:
             raise HTTPException(404, detail="File not found")
 
         if not isinstance(content, (bytes, bytearray)):
-            return Response(content=content, media_type="application/octet-stream")
+            return Response(content=content, media_type="application/octet-stream", headers=validators)
 
         content_length = len(content)
-        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        content_type = _guess_mime(os.path.splitext(full_path)[1].lower())
 
         if range_header:
-            range_match = re.match(r"bytes=(\\d+)-(\\d*)", range_header)
+            range_match = _RANGE_RE.match(range_header)
             if range_match:
                 start = int(range_match.group(1))
                 end = int(range_match.group(2)) if range_match.group(2) else content_length - 1
@@ -62,6 +123,7 @@ class VirtualFSRouteMixin(VirtualFSTempLinkMixin):
                 chunk_size = len(chunk)
 
                 headers = {
+                    **validators,
                     "Content-Range": f"bytes {start}-{end}/{content_length}",
                     "Accept-Ranges": "bytes",
                     "Content-Length": str(chunk_size),
@@ -71,6 +133,7 @@ class VirtualFSRouteMixin(VirtualFSTempLinkMixin):
                 return Response(content=chunk, status_code=206, headers=headers)
 
         headers = {
+            **validators,
             "Accept-Ranges": "bytes",
             "Content-Length": str(content_length),
             "Content-Type": content_type,
@@ -89,8 +152,9 @@ class VirtualFSRouteMixin(VirtualFSTempLinkMixin):
         adapter, mount, root, rel = await cls.resolve_adapter_and_rel(full_path)
         if not rel or rel.endswith("/"):
             raise HTTPException(400, detail="Not a file")
+        is_media = classify_filename(rel) != "other"
         has_native_thumb = False
-        if callable(getattr(adapter, "get_thumbnail", None)):
+        if not is_media and callable(getattr(adapter, "get_thumbnail", None)):
             stat_file = getattr(adapter, "stat_file", None)
             if callable(stat_file):
                 try:
@@ -98,7 +162,7 @@ class VirtualFSRouteMixin(VirtualFSTempLinkMixin):
                     has_native_thumb = bool(isinstance(stat, dict) and stat.get("has_thumbnail"))
                 except Exception:
                     has_native_thumb = False
-        if not (is_image_filename(rel) or is_video_filename(rel) or has_native_thumb):
+        if not (is_media or has_native_thumb):
             raise HTTPException(404, detail="Not an image, video, or native thumbnail file")
         data, mime, key = await get_or_create_thumb(adapter, mount.id, root, rel, w, h, fit)  # type: ignore
         headers = {
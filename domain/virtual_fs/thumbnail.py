@@ -2,51 +2,184 @@ import asyncio
 import inspect
 import io
 import hashlib
+import multiprocessing
+import os
+import re
 import subprocess
 import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import suppress
+from multiprocessing import shared_memory
+from functools import lru_cache
 from pathlib import Path
-from typing import Tuple
+from typing import Literal, Sequence, Tuple
 
-from PIL import Image
+import aiofiles
+from PIL import Image, ImageStat
 from fastapi import HTTPException
 
+from domain.config import ConfigService
+
 ALLOWED_EXT = {"jpg", "jpeg", "png", "webp", "gif", "bmp",
                "tiff", "arw", "cr2", "cr3", "nef", "rw2", "orf", "pef", "dng"}
 RAW_EXT = {"arw", "cr2", "cr3", "nef", "rw2", "orf", "pef", "dng"}
 VIDEO_EXT = {"mp4", "mov", "m4v", "avi", "mkv", "wmv", "flv", "webm", "mpg", "mpeg", "3gp"}
+MP4_FAMILY_EXT = {"mp4", "mov", "m4v", "3gp"}
 MAX_IMAGE_SOURCE_SIZE = 200 * 1024 * 1024
+# 与 Pillow 解压炸弹报错阈值一致，超过的图片解码必然失败
+MAX_IMAGE_SOURCE_PIXELS = 2 * 89_478_485
+# 大图先按 Range 读取文件头解析尺寸，确认可处理后再下载全文
+IMAGE_PEEK_MIN_SOURCE_SIZE = 8 * 1024 * 1024
+IMAGE_HEADER_PEEK_LIMIT = 256 * 1024
 VIDEO_TAIL_LIMIT = 2 * 1024 * 1024  # 2MB
 VIDEO_TAIL_FALLBACK_LIMIT = 4 * 1024 * 1024  # 4MB
 VIDEO_HEAD_LIMIT = 2 * 1024 * 1024  # 2MB
 VIDEO_HEAD_FALLBACK_LIMIT = 4 * 1024 * 1024  # 4MB
 VIDEO_THUMB_SEEK_SECONDS = (15, 10, 5, 3, 1, 0)
+VIDEO_SPARSE_TMP_DIR = "/dev/shm"
 VIDEO_BLACK_FRAME_MEAN_THRESHOLD = 12.0
+# 单次截多帧时在最后一个 seek 点之后继续查找关键帧的时长
+VIDEO_KEYFRAME_SEARCH_SECONDS = 2
+# 截帧时让 ffmpeg 顺带统计亮度均值（8bit 全范围 Y），打印到 stderr，省去 Pillow 再解码
+_FRAME_LUMA_FILTER = "format=yuvj420p,signalstats,metadata=print:key=lavfi.signalstats.YAVG:file=pipe\\:2"
+_YAVG_RE = re.compile(rb"lavfi\.signalstats\.YAVG=([0-9.]+)")
+_FRAME_TIME_RE = re.compile(rb"pts_time:(-?[0-9.]+)")
 CACHE_ROOT = Path('data/.thumb_cache')
+NATIVE_THUMB_SIZE_TOLERANCE = 0.2
+# 缩略图尺寸小，method=6 多花的编码时间有限，换来更小的缓存文件
+WEBP_QUALITY = 75
+WEBP_METHOD = 6
+# 限制同时运行的 ffmpeg 进程数，避免并发截帧时进程风暴
+_FFMPEG_SLOTS = asyncio.Semaphore(os.cpu_count() or 1)
+# 解码/缩放/编码等 CPU 密集的 Pillow 工作放到独立进程，避免阻塞事件循环
+_THUMB_POOL: ProcessPoolExecutor | None = None
+# 超过该大小的源数据改走共享内存，避免整块 pickle 后经管道复制给工作进程
+SHM_MIN_PAYLOAD_SIZE = 1024 * 1024
+# 进程内热点缩略图 LRU，命中时免去磁盘 stat/open/read
+THUMB_MEMORY_CACHE_MAX_ITEMS = 512
+THUMB_MEMORY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_THUMB_MEMORY_CACHE: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_thumb_memory_cache_bytes = 0
+_THUMB_INFLIGHT: dict[str, asyncio.Task] = {}
+_RAW_INFLIGHT: dict[str, asyncio.Task] = {}
+# 目录预热时同时生成的缩略图数量上限
+THUMB_WARM_CONCURRENCY = (os.cpu_count() or 1) * 2
+_THUMB_WARM_TASKS: set[asyncio.Task] = set()
 THUMB_CACHE_VERSION = "v2"
+# 已确认存在的缓存子目录；两级 256 分桶，总量天然有上限
+_KNOWN_CACHE_DIRS: set[Path] = set()
+RAW_CACHE_ROOT = Path('data/.raw_cache')
+RAW_JPEG_QUALITY = 90
+# RAW 转出的 JPEG 磁盘缓存总量上限，可通过配置 FOXEL_RAW_CACHE_MAX_BYTES 调整，<=0 表示不限制；
+# 超出后按最近访问时间（命中时刷新 mtime）淘汰到上限的 90%，源文件修改或删除后遗留的旧条目也随之清除
+RAW_CACHE_MAX_BYTES_CONFIG_KEY = "FOXEL_RAW_CACHE_MAX_BYTES"
+DEFAULT_RAW_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+RAW_CACHE_PRUNE_RATIO = 0.9
+_raw_cache_bytes: int | None = None
+_RAW_CACHE_PRUNE_LOCK = asyncio.Lock()
+
+
+def _warm_pool_worker():
+    # 工作进程导入本模块时已加载 Pillow，这里预先注册全部编解码插件
+    Image.init()
+
+
+def _get_thumb_pool() -> ProcessPoolExecutor:
+    global _THUMB_POOL
+    if _THUMB_POOL is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _THUMB_POOL = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_warm_pool_worker,
+        )
+    return _THUMB_POOL
 
 
-def is_image_filename(name: str) -> bool:
-    parts = name.rsplit('.', 1)
-    if len(parts) < 2:
+def shutdown_thumb_pool():
+    global _THUMB_POOL
+    if _THUMB_POOL is not None:
+        _THUMB_POOL.shutdown(wait=False, cancel_futures=True)
+        _THUMB_POOL = None
+
+
+async def _run_in_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_thumb_pool(), func, *args)
+    except BrokenProcessPool as e:
+        # 工作进程异常退出（如 OOM）后进程池不可再用，重建后再报错
+        shutdown_thumb_pool()
+        raise RuntimeError("缩略图工作进程异常退出") from e
+
+
+def _call_with_shared_bytes(func, shm_name: str, size: int, *args):
+    # 工作进程侧：按名字挂载共享内存读取源数据；由父进程负责 unlink
+    shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    return func(data, *args)
+
+
+def _shm_has_room(size: int) -> bool:
+    # 共享内存写满时进程会直接收到 SIGBUS，容器默认 /dev/shm 只有 64MB，需先确认剩余空间
+    try:
+        st = os.statvfs("/dev/shm")
+    except OSError:
         return False
-    return parts[1].lower() in ALLOWED_EXT
+    return st.f_bavail * st.f_frsize > size * 2
+
+
+async def _run_in_pool_with_bytes(func, data: bytes, *args):
+    """大块源数据经共享内存交给工作进程，任务本身只携带共享内存名和长度"""
+    size = len(data)
+    if size < SHM_MIN_PAYLOAD_SIZE or not _shm_has_room(size):
+        return await _run_in_pool(func, data, *args)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        shm.buf[:size] = data
+        return await _run_in_pool(_call_with_shared_bytes, func, shm.name, size, *args)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _file_ext(name: str) -> str:
+    i = name.rfind('.')
+    return name[i + 1:].lower() if i >= 0 else ''
+
+
+def is_image_filename(name: str) -> bool:
+    return _file_ext(name) in ALLOWED_EXT
 
 
 def is_raw_filename(name: str) -> bool:
-    parts = name.rsplit('.', 1)
-    if len(parts) < 2:
-        return False
-    return parts[1].lower() in RAW_EXT
+    return _file_ext(name) in RAW_EXT
 
 
 def is_video_filename(name: str) -> bool:
-    parts = name.rsplit('.', 1)
-    if len(parts) < 2:
-        return False
-    return parts[1].lower() in VIDEO_EXT
+    return _file_ext(name) in VIDEO_EXT
+
 
+def classify_filename(name: str) -> Literal["raw", "image", "video", "other"]:
+    """一次取扩展名完成分类；RAW 同时属于图片，优先返回 raw"""
+    ext = _file_ext(name)
+    if ext in RAW_EXT:
+        return "raw"
+    if ext in ALLOWED_EXT:
+        return "image"
+    if ext in VIDEO_EXT:
+        return "video"
+    return "other"
 
+
+# 列表页反复请求同一批缩略图，记忆化后热点命中不再重复计算摘要；
+# 摘要算法保持 sha1，避免已有磁盘缓存全部失效
+@lru_cache(maxsize=4096)
 def _cache_key(adapter_id: int, rel: str, size: int, mtime: int, w: int, h: int, fit: str) -> str:
     raw = f"{THUMB_CACHE_VERSION}|{adapter_id}|{rel}|{size}|{mtime}|{w}x{h}|{fit}".encode()
     return hashlib.sha1(raw).hexdigest()
@@ -57,8 +190,65 @@ def _cache_path(key: str) -> Path:
     return CACHE_ROOT / sub / f"{key}.webp"
 
 
+def _memory_cache_get(key: str) -> Tuple[bytes, str] | None:
+    item = _THUMB_MEMORY_CACHE.get(key)
+    if item is not None:
+        _THUMB_MEMORY_CACHE.move_to_end(key)
+    return item
+
+
+def _memory_cache_put(key: str, data: bytes, mime: str):
+    global _thumb_memory_cache_bytes
+    previous = _THUMB_MEMORY_CACHE.pop(key, None)
+    if previous is not None:
+        _thumb_memory_cache_bytes -= len(previous[0])
+    if len(data) > THUMB_MEMORY_CACHE_MAX_BYTES:
+        return
+    _THUMB_MEMORY_CACHE[key] = (data, mime)
+    _thumb_memory_cache_bytes += len(data)
+    while (
+        len(_THUMB_MEMORY_CACHE) > THUMB_MEMORY_CACHE_MAX_ITEMS
+        or _thumb_memory_cache_bytes > THUMB_MEMORY_CACHE_MAX_BYTES
+    ):
+        _, (evicted, _) = _THUMB_MEMORY_CACHE.popitem(last=False)
+        _thumb_memory_cache_bytes -= len(evicted)
+
+
 def _ensure_cache_dir(p: Path):
-    p.parent.mkdir(parents=True, exist_ok=True)
+    parent = p.parent
+    if parent in _KNOWN_CACHE_DIRS:
+        return
+    parent.mkdir(parents=True, exist_ok=True)
+    _KNOWN_CACHE_DIRS.add(parent)
+
+
+def _raw_cache_key(adapter_id: int, rel: str, size: int, mtime: int) -> str:
+    raw = f"raw_jpeg_q{RAW_JPEG_QUALITY}|{adapter_id}|{rel}|{size}|{mtime}".encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _raw_cache_path(key: str) -> Path:
+    sub = Path(key[:2]) / key[2:4]
+    return RAW_CACHE_ROOT / sub / f"{key}.jpg"
+
+
+def _write_cache_file(path: Path, data: bytes):
+    _ensure_cache_dir(path)
+    # 每次写入使用唯一的临时文件，并发写同一缓存项时不会互相覆盖或搬走对方未写完的文件
+    try:
+        fd, tmp_name = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    except FileNotFoundError:
+        # 缓存目录在运行期间被外部删除，丢弃记录后重建
+        _KNOWN_CACHE_DIRS.discard(path.parent)
+        _ensure_cache_dir(path)
+        fd, tmp_name = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    finally:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_name)
 
 
 def _image_to_webp(im, w: int, h: int, fit: str) -> Tuple[bytes, str]:
@@ -69,23 +259,33 @@ def _image_to_webp(im, w: int, h: int, fit: str) -> Tuple[bytes, str]:
         target_ratio = w / h
         if im_ratio > target_ratio:
             new_h = h
-            new_w = int(h * im_ratio)
+            new_w = max(1, int(h * im_ratio))
         else:
             new_w = w
-            new_h = int(w / im_ratio)
-        im = im.resize((new_w, new_h))
+            new_h = max(1, int(w / im_ratio))
+        # 大倍率缩小时先按整数倍做 box 缩小，再用 LANCZOS 精确缩放到目标尺寸
+        factor = min(im.width // new_w, im.height // new_h)
+        if factor >= 2:
+            im = im.reduce(factor)
+        im = im.resize((new_w, new_h), Image.Resampling.LANCZOS)
         left = max(0, (im.width - w)//2)
         top = max(0, (im.height - h)//2)
         im = im.crop((left, top, left + w, top + h))
     else:
         im.thumbnail((w, h))
+    # 完全不透明的 RGBA 去掉 alpha 通道，省去无意义的透明度编码
+    if im.mode == "RGBA" and im.getchannel("A").getextrema() == (255, 255):
+        im = im.convert("RGB")
     buf = io.BytesIO()
-    im.save(buf, 'WEBP', quality=80)
+    im.save(buf, 'WEBP', quality=WEBP_QUALITY, method=WEBP_METHOD)
     return buf.getvalue(), 'image/webp'
 
 
-def _load_image_with_pillow(data: bytes):
+def _load_image_with_pillow(data: bytes, draft_size: Tuple[int, int] | None = None):
     im = Image.open(io.BytesIO(data))
+    if draft_size and im.format == "JPEG":
+        # JPEG 解码时直接做 DCT 缩放（1/2、1/4、1/8），输出尺寸不小于 draft_size
+        im.draft("RGB", draft_size)
     im.load()
     return im
 
@@ -139,13 +339,19 @@ def _load_raw_with_ffmpeg(data: bytes, filename: str | None) -> "Image.Image":
                 Path(src_path).unlink()
 
 
-def load_image_from_bytes(data: bytes, *, filename: str | None = None, is_raw: bool = False):
+def load_image_from_bytes(
+    data: bytes,
+    *,
+    filename: str | None = None,
+    is_raw: bool = False,
+    draft_size: Tuple[int, int] | None = None,
+):
     if not is_raw:
-        return _load_image_with_pillow(data)
+        return _load_image_with_pillow(data, draft_size)
 
     first_error: Exception | None = None
     try:
-        return _load_image_with_pillow(data)
+        return _load_image_with_pillow(data, draft_size)
     except Exception as exc:
         first_error = exc
 
@@ -163,12 +369,117 @@ def raw_bytes_to_jpeg(data: bytes, filename: str | None = None) -> bytes:
     if im.mode != "RGB":
         im = im.convert("RGB")
     buf = io.BytesIO()
-    im.save(buf, "JPEG", quality=90)
+    im.save(buf, "JPEG", quality=RAW_JPEG_QUALITY)
     return buf.getvalue()
 
 
+async def get_or_create_raw_jpeg(
+    adapter, adapter_id: int, root: str, rel: str, stat: dict | None = None
+) -> Tuple[bytes, str | None]:
+    if stat is None:
+        stat = await adapter.stat_file(root, rel)
+    size = int(stat.get('size') or 0)
+    mtime = int(stat.get('mtime') or 0)
+    # 没有 size/mtime 时无法判断源文件是否变化，不做缓存
+    key = _raw_cache_key(adapter_id, rel, size, mtime) if (size or mtime) else None
+    if not key:
+        return await _build_raw_jpeg(adapter, root, rel, None), key
+
+    path = _raw_cache_path(key)
+    cached = await asyncio.to_thread(_read_raw_cache_file, path)
+    if cached is not None:
+        return cached, key
+
+    # 与缩略图相同：同一 RAW 的并发冷请求共享一次解码和缓存写入
+    inflight = _RAW_INFLIGHT.get(key)
+    if inflight is None:
+        inflight = asyncio.create_task(_build_raw_jpeg(adapter, root, rel, path))
+        _RAW_INFLIGHT[key] = inflight
+        inflight.add_done_callback(lambda task: _finish_inflight(_RAW_INFLIGHT, key, task))
+    return await asyncio.shield(inflight), key
+
+
+async def _build_raw_jpeg(adapter, root: str, rel: str, path: Path | None) -> bytes:
+    raw_data = await adapter.read_file(root, rel)
+    content = await _run_in_pool_with_bytes(raw_bytes_to_jpeg, raw_data, rel)
+    if path is not None:
+        try:
+            await asyncio.to_thread(_write_cache_file, path, content)
+        except OSError as e:
+            print(f"RAW cache write failed: {e}")
+        else:
+            await _record_raw_cache_write(len(content))
+    return content
+
+
+def _read_raw_cache_file(path: Path) -> bytes | None:
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    # 以 mtime 记录最近访问时间，不依赖可能被 noatime 关闭的 atime
+    with suppress(OSError):
+        os.utime(path)
+    return data
+
+
+async def _raw_cache_max_bytes() -> int:
+    raw = await ConfigService.get(RAW_CACHE_MAX_BYTES_CONFIG_KEY, DEFAULT_RAW_CACHE_MAX_BYTES)
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return DEFAULT_RAW_CACHE_MAX_BYTES
+
+
+async def _record_raw_cache_write(size: int):
+    """累计 RAW 缓存写入量，超出上限时在后台线程按 LRU 淘汰；进程启动后首次写入时扫描一次得到实际总量"""
+    global _raw_cache_bytes
+    max_bytes = await _raw_cache_max_bytes()
+    if max_bytes <= 0:
+        return
+    if _raw_cache_bytes is not None:
+        _raw_cache_bytes += size
+        if _raw_cache_bytes <= max_bytes:
+            return
+    if _RAW_CACHE_PRUNE_LOCK.locked():
+        return
+    async with _RAW_CACHE_PRUNE_LOCK:
+        try:
+            _raw_cache_bytes = await asyncio.to_thread(_prune_raw_cache, max_bytes)
+        except OSError as e:
+            print(f"RAW cache prune failed: {e}")
+
+
+def _prune_raw_cache(max_bytes: int) -> int:
+    entries: list[tuple[float, int, Path]] = []
+    total = 0
+    for path in RAW_CACHE_ROOT.glob("*/*/*.jpg"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    if total <= max_bytes:
+        return total
+    entries.sort()
+    target = int(max_bytes * RAW_CACHE_PRUNE_RATIO)
+    for _, size, path in entries:
+        if total <= target:
+            break
+        with suppress(FileNotFoundError):
+            path.unlink()
+        total -= size
+    return total
+
+
 def generate_thumb(data: bytes, w: int, h: int, fit: str, is_raw: bool = False, filename: str | None = None) -> Tuple[bytes, str]:
-    im = load_image_from_bytes(data, filename=filename, is_raw=is_raw)
+    im = load_image_from_bytes(data, filename=filename, is_raw=is_raw, draft_size=(w, h))
+    return _image_to_webp(im, w, h, fit)
+
+
+def _reencode_to_webp(data: bytes, w: int, h: int, fit: str) -> Tuple[bytes, str]:
+    im = Image.open(io.BytesIO(data))
     return _image_to_webp(im, w, h, fit)
 
 
@@ -244,6 +555,47 @@ async def _read_range_slice(adapter, root: str, rel: str, start: int, end: int)
     return b""
 
 
+def _probe_image_size(head_bytes: bytes) -> Tuple[int, int] | None:
+    # Image.open 只解析文件头，不解码像素
+    try:
+        with Image.open(io.BytesIO(head_bytes)) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+def _native_webp_fits(data: bytes, w: int, h: int, fit: str) -> bool:
+    """适配器返回的原生缩略图已是 WebP 且尺寸接近目标时，可直接使用无需重编码"""
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return False
+    dims = _probe_image_size(data)
+    if not dims:
+        return False
+    tw, th = dims
+    tol = NATIVE_THUMB_SIZE_TOLERANCE
+    if fit == 'cover':
+        return abs(tw - w) <= w * tol and abs(th - h) <= h * tol
+    return tw <= w * (1 + tol) and th <= h * (1 + tol) and (tw >= w * (1 - tol) or th >= h * (1 - tol))
+
+
+async def _read_image_for_thumb(adapter, root: str, rel: str, size: int, is_raw: bool) -> bytes:
+    if size > MAX_IMAGE_SOURCE_SIZE:
+        raise HTTPException(400, detail="Image too large for thumbnail")
+    supports_range = callable(getattr(adapter, "read_file_range", None)) or callable(
+        getattr(adapter, "stream_file", None)
+    )
+    if not is_raw and supports_range and size > IMAGE_PEEK_MIN_SOURCE_SIZE:
+        try:
+            head_bytes = await _read_range_slice(adapter, root, rel, 0, IMAGE_HEADER_PEEK_LIMIT - 1)
+        except Exception as e:
+            print(f"Image header peek failed: {e}")
+            head_bytes = b""
+        dims = _probe_image_size(head_bytes) if head_bytes else None
+        if dims and dims[0] * dims[1] > MAX_IMAGE_SOURCE_PIXELS:
+            raise HTTPException(400, detail="Image too large for thumbnail")
+    return await adapter.read_file(root, rel)
+
+
 async def _read_video_head(adapter, root: str, rel: str, size: int, limit: int = VIDEO_HEAD_LIMIT) -> bytes:
     end = limit - 1
     if size > 0:
@@ -262,42 +614,95 @@ async def _read_video_tail(adapter, root: str, rel: str, size: int, limit: int)
     return data, start
 
 
+def _mp4_head_has_moov(head_bytes: bytes) -> bool:
+    """扫描顶层 box：moov 先于 mdat 出现且完整落在 head_bytes 内时返回 True"""
+    offset = 0
+    total = len(head_bytes)
+    while offset + 8 <= total:
+        size = int.from_bytes(head_bytes[offset:offset + 4], "big")
+        box_type = head_bytes[offset + 4:offset + 8]
+        header_size = 8
+        if size == 1:
+            if offset + 16 > total:
+                return False
+            size = int.from_bytes(head_bytes[offset + 8:offset + 16], "big")
+            header_size = 16
+        elif size == 0:
+            # size 为 0 表示 box 延伸到文件末尾，无法确认 moov 是否完整
+            return False
+        if size < header_size:
+            return False
+        if box_type == b"moov":
+            return offset + size <= total
+        if box_type == b"mdat":
+            return False
+        offset += size
+    return False
+
+
+@lru_cache(maxsize=1)
+def _video_sparse_tmp_dir() -> str | None:
+    # tmpfs 天然支持稀疏文件且不落盘，可用时优先在其中构造 head+tail 副本
+    if os.path.isdir(VIDEO_SPARSE_TMP_DIR) and os.access(VIDEO_SPARSE_TMP_DIR, os.W_OK):
+        return VIDEO_SPARSE_TMP_DIR
+    return None
+
+
 def _write_video_sparse_file(rel: str, head_bytes: bytes, tail_bytes: bytes, tail_offset: int) -> str:
+    """按原始偏移写入头尾片段（mp4 的 sample 偏移是绝对值，不能简单拼接），中间留空洞"""
     suffix = Path(rel).suffix or ".mp4"
-    src_tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
-    src_path = src_tmp.name
+    fd, src_path = tempfile.mkstemp(suffix=suffix, dir=_video_sparse_tmp_dir())
     try:
-        if head_bytes:
-            src_tmp.write(head_bytes)
-            src_tmp.flush()
-    finally:
-        src_tmp.close()
-
-    if tail_bytes:
-        with open(src_path, "r+b") as f:
-            f.seek(max(0, int(tail_offset)))
-            f.write(tail_bytes)
-            f.flush()
+        with os.fdopen(fd, "wb") as f:
+            if head_bytes:
+                f.write(head_bytes)
+            if tail_bytes:
+                tail_offset = max(0, int(tail_offset))
+                # 先 truncate 到完整长度，空洞部分不会写入任何零字节
+                f.truncate(max(f.tell(), tail_offset + len(tail_bytes)))
+                f.seek(tail_offset)
+                f.write(tail_bytes)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(src_path)
+        raise
     return src_path
 
 
-async def _run_ffmpeg_extract_frame(src_path: str, dst_path: str, *, seek_seconds: float | None = None):
+def _ffmpeg_error_text(stderr: bytes, default: str) -> str:
+    # stderr 中混有 metadata 滤镜打印的逐帧统计，报错时只保留真正的错误信息
+    lines = [
+        line for line in stderr.decode(errors="replace").splitlines()
+        if not line.startswith(("frame:", "lavfi."))
+    ]
+    return "\n".join(lines).strip() or default
+
+
+def _parse_frame_lumas(stderr: bytes) -> list[float]:
+    return [float(m) for m in _YAVG_RE.findall(stderr)]
+
+
+async def _run_ffmpeg_extract_frame(src_path: str, *, seek_seconds: float | None = None) -> tuple[bytes, float | None]:
     cmd = [
         "ffmpeg",
         "-y",
         "-hide_banner",
         "-loglevel", "error",
     ]
-    is_http_input = src_path.startswith(("http://", "https://"))
-    if is_http_input and seek_seconds is not None:
-        cmd += ["-ss", str(seek_seconds), "-i", src_path]
-    else:
-        cmd += ["-i", src_path]
-        if seek_seconds is not None:
-            cmd += ["-ss", str(seek_seconds)]
+    # -ss 放在 -i 之前走输入端 seek，直接跳到最近的关键帧，无需从头解码
+    if seek_seconds is not None:
+        cmd += ["-noaccurate_seek", "-ss", str(seek_seconds)]
+    cmd += ["-i", src_path]
     cmd += [
         "-frames:v", "1",
-        dst_path,
+        "-an",
+        "-sn",
+        "-vf", _FRAME_LUMA_FILTER,
+        # 单帧直接以 MJPEG 写到 stdout，省去临时 PNG 的落盘与编解码
+        "-f", "image2pipe",
+        "-vcodec", "mjpeg",
+        "-q:v", "3",
+        "pipe:1",
     ]
     try:
         proc = await asyncio.create_subprocess_exec(
@@ -308,61 +713,189 @@ async def _run_ffmpeg_extract_frame(src_path: str, dst_path: str, *, seek_second
     except FileNotFoundError as e:
         raise RuntimeError("未找到 ffmpeg，可执行文件需要在 PATH 中") from e
 
-    stdout, stderr = await proc.communicate()
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        with suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise RuntimeError(_ffmpeg_error_text(stderr, "ffmpeg 执行失败"))
+    if not stdout:
+        raise RuntimeError(_ffmpeg_error_text(stderr, "ffmpeg 未输出视频帧"))
+    lumas = _parse_frame_lumas(stderr)
+    return stdout, lumas[0] if lumas else None
+
+
+async def _run_ffmpeg_extract_frames(
+    src_path: str, seeks: Sequence[float]
+) -> list[tuple[bytes, float | None] | None]:
+    """一次 ffmpeg 调用、只打开一次源，为每个 seek 点取其后第一个关键帧；
+    返回列表与 seeks 逐项对应，窗口内没有关键帧（如超出视频时长）的点为 None"""
+    if not seeks:
+        return []
+    # 每个 seek 点选中 t >= s 的第一帧：此前选中的帧早于 s 即可；gt(...,0) 保证始终只输出到唯一的输出端
+    terms = "+".join(
+        f"gte(t,{s})*(isnan(prev_selected_t)+lt(prev_selected_t,{s}))" for s in sorted(set(seeks))
+    )
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-hide_banner",
+        "-loglevel", "error",
+        # 只解码关键帧，与逐点 -noaccurate_seek 一样落在关键帧上，单次顺序读取即可覆盖所有 seek 点
+        "-skip_frame", "nokey",
+        "-t", str(max(seeks) + VIDEO_KEYFRAME_SEARCH_SECONDS),
+        "-i", src_path,
+        "-map", "0:v:0",
+        "-an",
+        "-sn",
+        "-vf", f"setpts=PTS-STARTPTS,select='gt({terms},0)',{_FRAME_LUMA_FILTER}",
+        "-vsync", "passthrough",
+        "-f", "image2pipe",
+        "-vcodec", "mjpeg",
+        "-q:v", "3",
+        "pipe:1",
+    ]
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError as e:
+        raise RuntimeError("未找到 ffmpeg，可执行文件需要在 PATH 中") from e
+
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        with suppress(ProcessLookupError):
+            proc.kill()
+        await proc.wait()
+        raise
     if proc.returncode != 0:
-        message = stderr.decode().strip() or stdout.decode().strip() or "ffmpeg 执行失败"
-        raise RuntimeError(message)
+        raise RuntimeError(_ffmpeg_error_text(stderr, "ffmpeg 执行失败"))
+    frames = _split_mjpeg_stream(stdout)
+    times = [float(m) for m in _FRAME_TIME_RE.findall(stderr)]
+    if len(times) != len(frames):
+        # 无法确定每帧对应的时间点，交由调用方逐点截帧
+        return [None] * len(seeks)
+    lumas: list[float | None] = list(_parse_frame_lumas(stderr))
+    if len(lumas) != len(frames):
+        lumas = [None] * len(frames)
+    result: list[tuple[bytes, float | None] | None] = []
+    for seek_seconds in seeks:
+        # 输出帧按时间递增，seek 点对应第一个不早于它的帧（pts_time 打印精度有限，留出容差）
+        index = next((i for i, t in enumerate(times) if t >= seek_seconds - 1e-4), None)
+        result.append(None if index is None else (frames[index], lumas[index]))
+    return result
+
+
+def _split_mjpeg_stream(data: bytes) -> list[bytes]:
+    # 熵编码段中的 0xFF 会被填充为 FF00，FFD8/FFD9 只会作为 SOI/EOI 标记出现
+    frames: list[bytes] = []
+    start = data.find(b"\xff\xd8")
+    while start >= 0:
+        end = data.find(b"\xff\xd9", start + 2)
+        if end < 0:
+            break
+        frames.append(data[start:end + 2])
+        start = data.find(b"\xff\xd8", end + 2)
+    return frames
 
 
 def _frame_mean_luma(im) -> float:
-    from PIL import ImageStat
-    gray = im.convert("L").resize((64, 64))
-    return float(ImageStat.Stat(gray).mean[0])
+    # ImageStat 基于直方图一次遍历得到各通道均值，按 BT.601 加权即为亮度均值
+    if im.mode == "L":
+        return float(ImageStat.Stat(im).mean[0])
+    if im.mode != "RGB":
+        im = im.convert("RGB")
+    r, g, b = ImageStat.Stat(im).mean
+    return float(r * 0.299 + g * 0.587 + b * 0.114)
 
 
-def _is_black_image_bytes(image_bytes: bytes) -> bool:
-    from PIL import Image
-    with Image.open(io.BytesIO(image_bytes)) as im:
+def _frame_bytes_to_webp(
+    frame_bytes: bytes, w: int, h: int, fit: str, mean: float | None = None
+) -> tuple[float, bytes, str]:
+    with Image.open(io.BytesIO(frame_bytes)) as im:
         im.load()
-        return _frame_mean_luma(im) < VIDEO_BLACK_FRAME_MEAN_THRESHOLD
-
+        # ffmpeg 未给出亮度统计时才回退到 Pillow 计算
+        if mean is None:
+            mean = _frame_mean_luma(im)
+        webp_bytes, mime = _image_to_webp(im, w, h, fit)
+    return mean, webp_bytes, mime
 
-async def _generate_video_thumb_from_src_path(src_path: str, w: int, h: int, fit: str) -> Tuple[bytes, str]:
-    from PIL import Image
 
-    dst_tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
-    dst_path = dst_tmp.name
-    dst_tmp.close()
+async def _generate_video_thumb_from_src_path(src_path: str, w: int, h: int, fit: str) -> tuple[bytes, str, float]:
+    """截取视频缩略图，返回 (webp, mime, 所选帧的亮度均值)"""
+    async def _attempt(seek_seconds: float) -> tuple[float, bytes, str]:
+        async with _FFMPEG_SLOTS:
+            frame_bytes, mean = await _run_ffmpeg_extract_frame(src_path, seek_seconds=seek_seconds)
+        return await _run_in_pool(_frame_bytes_to_webp, frame_bytes, w, h, fit, mean)
 
     best: tuple[float, bytes, str] | None = None
     last_error: Exception | None = None
+
+    # 优先用一次 ffmpeg 调用取出所有候选帧，省去多次进程启动
     try:
-        for seek_seconds in VIDEO_THUMB_SEEK_SECONDS:
+        async with _FFMPEG_SLOTS:
+            frames = await _run_ffmpeg_extract_frames(src_path, VIDEO_THUMB_SEEK_SECONDS)
+        # 保持 seek 点的优先级顺序；窗口内没有帧的点跳过
+        frames = [frame for frame in frames if frame is not None]
+    except Exception as e:
+        last_error = e
+        frames = []
+    if frames and all(mean is not None for _, mean in frames):
+        # 每帧亮度已由 ffmpeg 给出，黑帧无需编码，只编码选中的一帧
+        frame_bytes, mean = next(
+            (frame for frame in frames if frame[1] >= VIDEO_BLACK_FRAME_MEAN_THRESHOLD),
+            max(frames, key=lambda frame: frame[1]),
+        )
+        try:
+            mean, webp_bytes, mime = await _run_in_pool(_frame_bytes_to_webp, frame_bytes, w, h, fit, mean)
+            return webp_bytes, mime, mean
+        except Exception as e:
+            last_error = e
+            frames = []
+    for frame_bytes, mean in frames:
+        try:
+            mean, webp_bytes, mime = await _run_in_pool(_frame_bytes_to_webp, frame_bytes, w, h, fit, mean)
+        except Exception as e:
+            last_error = e
+            continue
+        if best is None or mean > best[0]:
+            best = (mean, webp_bytes, mime)
+        if mean >= VIDEO_BLACK_FRAME_MEAN_THRESHOLD:
+            return webp_bytes, mime, mean
+    if best is not None:
+        return best[1], best[2], best[0]
+
+    # 回退：各 seek 点并发截帧，但按 VIDEO_THUMB_SEEK_SECONDS 的优先级依次取结果，
+    # 只有更靠前的点都是黑帧或失败时才采用后面的点，结果与完成先后无关；选定后取消其余尝试
+    tasks = [asyncio.create_task(_attempt(seek_seconds)) for seek_seconds in VIDEO_THUMB_SEEK_SECONDS]
+    try:
+        for task in tasks:
             try:
-                with suppress(FileNotFoundError):
-                    Path(dst_path).unlink()
-                await _run_ffmpeg_extract_frame(src_path, dst_path, seek_seconds=seek_seconds)
-                with Image.open(dst_path) as im:
-                    im.load()
-                    mean = _frame_mean_luma(im)
-                    webp_bytes, mime = _image_to_webp(im, w, h, fit)
-
-                if best is None or mean > best[0]:
-                    best = (mean, webp_bytes, mime)
-                if mean >= VIDEO_BLACK_FRAME_MEAN_THRESHOLD:
-                    return webp_bytes, mime
+                mean, webp_bytes, mime = await task
             except Exception as e:
                 last_error = e
                 continue
 
-        if best is not None:
-            return best[1], best[2]
-        if last_error is not None:
-            raise last_error
-        raise RuntimeError("ffmpeg 截帧失败")
+            if best is None or mean > best[0]:
+                best = (mean, webp_bytes, mime)
+            if mean >= VIDEO_BLACK_FRAME_MEAN_THRESHOLD:
+                return webp_bytes, mime, mean
     finally:
-        with suppress(FileNotFoundError):
-            Path(dst_path).unlink()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if best is not None:
+        return best[1], best[2], best[0]
+    if last_error is not None:
+        raise last_error
+    raise RuntimeError("ffmpeg 截帧失败")
 
 
 async def _generate_video_thumb_from_segments(
@@ -373,7 +906,7 @@ async def _generate_video_thumb_from_segments(
     w: int,
     h: int,
     fit: str,
-) -> Tuple[bytes, str]:
+) -> tuple[bytes, str, float]:
     src_path = _write_video_sparse_file(rel, head_bytes, tail_bytes, tail_offset)
     try:
         return await _generate_video_thumb_from_src_path(src_path, w, h, fit)
@@ -385,31 +918,114 @@ async def _generate_video_thumb_from_segments(
 async def get_or_create_thumb(adapter, adapter_id: int, root: str, rel: str, w: int, h: int, fit: str = 'cover'):
     stat = await adapter.stat_file(root, rel)
     size = int(stat.get('size') or 0)
-    is_video = is_video_filename(rel)
-    is_image = is_image_filename(rel)
-    get_thumb_impl = getattr(adapter, "get_thumbnail", None)
-    should_try_native_thumb = callable(get_thumb_impl) and (
-        is_image or is_video or bool(stat.get("has_thumbnail"))
-    )
 
     key = _cache_key(adapter_id, rel, size, int(
         stat.get('mtime', 0)), w, h, fit)
+    cached = _memory_cache_get(key)
+    if cached is not None:
+        return cached[0], cached[1], key
+
     path = _cache_path(key)
-    if path.exists():
-        return path.read_bytes(), 'image/webp', key
+    try:
+        async with aiofiles.open(path, "rb") as f:
+            data = await f.read()
+    except FileNotFoundError:
+        pass
+    else:
+        _memory_cache_put(key, data, 'image/webp')
+        return data, 'image/webp', key
 
-    _ensure_cache_dir(path)
+    # 同一缩略图的并发冷请求只生成一次：生成放在独立任务中，任一请求断开都不会中断共享的生成
+    inflight = _THUMB_INFLIGHT.get(key)
+    if inflight is None:
+        inflight = asyncio.create_task(_build_thumb(adapter, root, rel, stat, w, h, fit, key, path))
+        _THUMB_INFLIGHT[key] = inflight
+        inflight.add_done_callback(lambda task: _finish_inflight(_THUMB_INFLIGHT, key, task))
+    thumb_bytes, mime = await asyncio.shield(inflight)
+    return thumb_bytes, mime, key
+
+
+async def _build_thumb(adapter, root: str, rel: str, stat: dict, w: int, h: int, fit: str, key: str, path: Path):
+    thumb_bytes, mime = await _create_thumb(adapter, root, rel, stat, w, h, fit)
+    try:
+        # 先写临时文件再原子替换，其他请求不会读到写了一半的缓存
+        await asyncio.to_thread(_write_cache_file, path, thumb_bytes)
+    except OSError as e:
+        print(f"Thumbnail cache write failed: {e}")
+    _memory_cache_put(key, thumb_bytes, mime)
+    return thumb_bytes, mime
+
+
+def _finish_inflight(inflight: dict[str, asyncio.Task], key: str, task: asyncio.Task):
+    if inflight.get(key) is task:
+        del inflight[key]
+    # 所有等待者都已断开时，避免 "exception was never retrieved" 告警
+    if not task.cancelled():
+        task.exception()
+
+
+async def bulk_warm(
+    adapter,
+    adapter_id: int,
+    root: str,
+    entries: Sequence[Tuple[str, int, int]],
+    w: int,
+    h: int,
+    fit: str = 'cover',
+):
+    """批量预生成缩略图，entries 为 (rel, size, mtime)；已缓存的跳过，单个失败不影响其余"""
+    candidates: list[Tuple[str, str]] = []
+    for rel, size, mtime in entries:
+        key = _cache_key(adapter_id, rel, int(size or 0), int(mtime or 0), w, h, fit)
+        if key in _THUMB_MEMORY_CACHE or key in _THUMB_INFLIGHT:
+            continue
+        candidates.append((rel, key))
+    if not candidates:
+        return
+
+    def _filter_disk_cached() -> list[str]:
+        return [rel for rel, key in candidates if not _cache_path(key).exists()]
+
+    missing = await asyncio.to_thread(_filter_disk_cached)
+    slots = asyncio.Semaphore(THUMB_WARM_CONCURRENCY)
+
+    async def _warm(rel: str):
+        async with slots:
+            try:
+                await get_or_create_thumb(adapter, adapter_id, root, rel, w, h, fit)
+            except Exception as e:
+                print(f"Thumbnail prewarm failed for {rel}: {e}")
+
+    await asyncio.gather(*(_warm(rel) for rel in missing))
+
+
+def schedule_bulk_warm(adapter, adapter_id: int, root: str, entries: Sequence[Tuple[str, int, int]], w: int, h: int, fit: str = 'cover'):
+    """在后台执行 bulk_warm，不阻塞调用方"""
+    task = asyncio.create_task(bulk_warm(adapter, adapter_id, root, list(entries), w, h, fit))
+    _THUMB_WARM_TASKS.add(task)
+    task.add_done_callback(_THUMB_WARM_TASKS.discard)
+
+
+async def _create_thumb(adapter, root: str, rel: str, stat: dict, w: int, h: int, fit: str) -> Tuple[bytes, str]:
+    size = int(stat.get('size') or 0)
+    kind = classify_filename(rel)
+    is_video = kind == "video"
+    is_image = kind in ("image", "raw")
+    get_thumb_impl = getattr(adapter, "get_thumbnail", None)
+    should_try_native_thumb = callable(get_thumb_impl) and (
+        is_image or is_video or bool(stat.get("has_thumbnail"))
+    )
     thumb_bytes, mime = None, None
 
     if should_try_native_thumb:
         size_str = "large" if w > 400 else "medium" if w > 100 else "small"
         native_thumb_bytes = await get_thumb_impl(root, rel, size_str)
 
-        if native_thumb_bytes:
+        if native_thumb_bytes and _native_webp_fits(native_thumb_bytes, w, h, fit):
+            thumb_bytes, mime = native_thumb_bytes, 'image/webp'
+        elif native_thumb_bytes:
             try:
-                from PIL import Image
-                im = Image.open(io.BytesIO(native_thumb_bytes))
-                thumb_bytes, mime = _image_to_webp(im, w, h, fit)
+                thumb_bytes, mime = await _run_in_pool(_reencode_to_webp, native_thumb_bytes, w, h, fit)
             except Exception as e:
                 print(
                     f"Failed to convert native thumbnail to WebP: {e}, falling back.")
@@ -420,7 +1036,7 @@ async def get_or_create_thumb(adapter, adapter_id: int, root: str, rel: str, w:
 
     if not thumb_bytes:
         if is_video:
-            async def _maybe_transcoding_thumb() -> Tuple[bytes, str] | None:
+            async def _maybe_transcoding_thumb() -> tuple[bytes, str, float] | None:
                 fid = (stat or {}).get("fid") if isinstance(stat, dict) else None
                 get_url = getattr(adapter, "get_video_transcoding_url", None)
                 if not fid or not callable(get_url):
@@ -461,23 +1077,27 @@ async def get_or_create_thumb(adapter, adapter_id: int, root: str, rel: str, w:
                     raise HTTPException(500, detail=f"Video read failed: {e}")
 
             head_bytes = await _read_head(VIDEO_HEAD_LIMIT)
-            tail_bytes, tail_offset = await _read_tail(VIDEO_TAIL_LIMIT)
+            if _file_ext(rel) in MP4_FAMILY_EXT and _mp4_head_has_moov(head_bytes):
+                # moov 已完整位于文件头（faststart / 分片 mp4），无需再读文件尾
+                tail_bytes, tail_offset = b"", 0
+            else:
+                tail_bytes, tail_offset = await _read_tail(VIDEO_TAIL_LIMIT)
             if not head_bytes and not tail_bytes:
                 raise HTTPException(500, detail="Unable to read video data for thumbnail")
 
             try:
-                thumb_bytes, mime = await _generate_video_thumb_from_segments(
+                thumb_bytes, mime, thumb_mean = await _generate_video_thumb_from_segments(
                     head_bytes, tail_bytes, tail_offset, rel, w, h, fit
                 )
             except Exception as e1:
                 if _is_hevc_decoder_missing(e1):
                     got = await _maybe_transcoding_thumb()
                     if got is not None:
-                        thumb_bytes, mime = got
+                        thumb_bytes, mime, thumb_mean = got
                 if not thumb_bytes:
                     try:
                         tail_bytes, tail_offset = await _read_tail(VIDEO_TAIL_FALLBACK_LIMIT)
-                        thumb_bytes, mime = await _generate_video_thumb_from_segments(
+                        thumb_bytes, mime, thumb_mean = await _generate_video_thumb_from_segments(
                             head_bytes, tail_bytes, tail_offset, rel, w, h, fit
                         )
                     except HTTPException:
@@ -486,23 +1106,21 @@ async def get_or_create_thumb(adapter, adapter_id: int, root: str, rel: str, w:
                         print(f"Video thumbnail generation failed: {e2}")
                         raise HTTPException(500, detail=f"Video thumbnail generation failed: {e2}")
 
-            if thumb_bytes and _is_black_image_bytes(thumb_bytes):
+            if thumb_bytes and thumb_mean < VIDEO_BLACK_FRAME_MEAN_THRESHOLD:
                 try:
                     head_bytes = await _read_head(VIDEO_HEAD_FALLBACK_LIMIT)
-                    retry_thumb, retry_mime = await _generate_video_thumb_from_segments(
+                    retry_thumb, retry_mime, retry_mean = await _generate_video_thumb_from_segments(
                         head_bytes, tail_bytes, tail_offset, rel, w, h, fit
                     )
-                    if retry_thumb and not _is_black_image_bytes(retry_thumb):
+                    if retry_thumb and retry_mean >= VIDEO_BLACK_FRAME_MEAN_THRESHOLD:
                         thumb_bytes, mime = retry_thumb, retry_mime
                 except Exception:
                     pass
         elif is_image:
-            if size > MAX_IMAGE_SOURCE_SIZE:
-                raise HTTPException(400, detail="Image too large for thumbnail")
-            read_data = await adapter.read_file(root, rel)
+            read_data = await _read_image_for_thumb(adapter, root, rel, size, kind == "raw")
             try:
-                thumb_bytes, mime = generate_thumb(
-                    read_data, w, h, fit, is_raw=is_raw_filename(rel), filename=rel)
+                thumb_bytes, mime = await _run_in_pool_with_bytes(
+                    generate_thumb, read_data, w, h, fit, kind == "raw", rel)
             except Exception as e:
                 print(e)
                 raise HTTPException(
@@ -511,8 +1129,7 @@ async def get_or_create_thumb(adapter, adapter_id: int, root: str, rel: str, w:
             raise HTTPException(500, detail="Native thumbnail unavailable")
 
     if thumb_bytes:
-        path.write_bytes(thumb_bytes)
-        return thumb_bytes, mime, key
+        return thumb_bytes, mime
 
     raise HTTPException(
         500, detail="Failed to generate thumbnail by any means")
@@ -1,18 +1,113 @@
+import asyncio
+import os
 import shutil
+import tempfile
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 import aiofiles
 from fastapi import HTTPException
 
+from domain.config import ConfigService
+from domain.tasks import Task, task_queue_service
+
 from .file_ops import VirtualFSFileOpsMixin
 
+# 1 MiB，页大小的整数倍；可通过配置 FOXEL_COPY_BUFFER 调整
+DEFAULT_COPY_BUFFER_SIZE = 1024 * 1024
+DEFAULT_TRANSFER_CONCURRENCY = 8
+TRANSFER_QUEUE_SIZE = 64
+# 进度最多每 0.25 秒或每传输 8 MiB 刷新一次
+PROGRESS_MIN_INTERVAL = 0.25
+PROGRESS_MIN_BYTES = 8 * 1024 * 1024
+
+
+async def iter_file_chunks(path: Path, chunk_size: int = DEFAULT_COPY_BUFFER_SIZE) -> AsyncIterator[bytes]:
+    """按块读取本地文件：os.read 直接读入新的 bytes，下游可自由暂存分块，无需额外复制"""
+    fd = await asyncio.to_thread(os.open, path, os.O_RDONLY)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(os.read, fd, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        os.close(fd)
+
+
+@dataclass(slots=True)
+class TransferJob:
+    src_rel: str
+    dst_rel: str
+    size: int | None
+    name: str
+    # 入队序号，中转时用作扁平临时文件名
+    index: int = 0
+
+
+@dataclass(slots=True)
+class PreparedTransfer:
+    root_s: str
+    rel_s: str
+    rel_d: str
+    debug_info: Dict[str, Any]
+    op_func: Any = None
+    # 已转为跨挂载任务或源与目标相同，调用方直接返回 debug_info
+    done: bool = False
+
 
 class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
+    COPY_BUFFER_CONFIG_KEY = "FOXEL_COPY_BUFFER"
+    TRANSFER_CONCURRENCY_CONFIG_KEY = "FOXEL_XFER_CONCURRENCY"
+
     @classmethod
-    async def move_path(
-        cls, src: str, dst: str, overwrite: bool = False, return_debug: bool = True, allow_cross: bool = False
-    ):
+    async def _transfer_concurrency(cls) -> int:
+        """跨挂载传输时同时处理的文件数"""
+        raw = await ConfigService.get(cls.TRANSFER_CONCURRENCY_CONFIG_KEY, DEFAULT_TRANSFER_CONCURRENCY)
+        try:
+            concurrency = int(raw)
+        except (TypeError, ValueError):
+            concurrency = DEFAULT_TRANSFER_CONCURRENCY
+        return max(1, concurrency)
+
+    @classmethod
+    async def _copy_buffer_size(cls) -> int:
+        """跨挂载中转时读写临时文件的块大小"""
+        raw = await ConfigService.get(cls.COPY_BUFFER_CONFIG_KEY, DEFAULT_COPY_BUFFER_SIZE)
+        try:
+            size = int(raw)
+        except (TypeError, ValueError):
+            size = DEFAULT_COPY_BUFFER_SIZE
+        return max(64 * 1024, size)
+
+    @classmethod
+    async def _probe_destination(cls, adapter: Any, root: str, rel: str) -> Tuple[bool | None, Any]:
+        """单次适配器调用探测目标：优先 stat_path（顺带返回调试信息），没有时才退回 exists；两者都没有返回 (None, None)"""
+        stat_func = cls._adapter_method(adapter, "stat_path")
+        if stat_func is not None:
+            try:
+                dst_stat = await stat_func(root, rel)
+            except FileNotFoundError:
+                return False, None
+            except HTTPException as exc:
+                if exc.status_code == 404:
+                    return False, None
+                raise
+            if isinstance(dst_stat, dict):
+                return bool(dst_stat.get("exists", True)), dst_stat
+            return dst_stat is not None, dst_stat
+        exists_func = cls._adapter_method(adapter, "exists")
+        if exists_func is not None:
+            return bool(await exists_func(root, rel)), None
+        return None, None
+
+    @classmethod
+    async def _prepare_transfer(
+        cls, src: str, dst: str, operation: str, overwrite: bool, allow_cross: bool = False
+    ) -> PreparedTransfer:
+        """move/rename/copy 共用的预检查：解析路径、跨挂载入队、目标存在性校验与覆盖前删除"""
         adapter_s, adapter_model_s, root_s, rel_s = await cls.resolve_adapter_and_rel(src)
         adapter_d, adapter_model_d, root_d, rel_d = await cls.resolve_adapter_and_rel(dst)
         debug_info = {
@@ -23,41 +118,46 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
             "root_s": root_s,
             "root_d": root_d,
             "overwrite": overwrite,
-            "operation": "move",
+            "operation": operation,
             "queued": False,
         }
+        prepared = PreparedTransfer(root_s=root_s, rel_s=rel_s, rel_d=rel_d, debug_info=debug_info)
+        cross = adapter_model_s.id != adapter_model_d.id
+        if cross and not allow_cross:
+            raise HTTPException(400, detail=f"Cross-adapter {operation} not supported")
         if not rel_s:
-            raise HTTPException(400, detail="Cannot move or rename mount root")
+            root_label = "move or rename" if operation == "move" else operation
+            raise HTTPException(400, detail=f"Cannot {root_label} mount root")
         if not rel_d:
             raise HTTPException(400, detail="Invalid destination")
 
-        if adapter_model_s.id != adapter_model_d.id:
-            if not allow_cross:
-                raise HTTPException(400, detail="Cross-adapter move not supported")
+        if cross:
             queue_info = await cls._enqueue_cross_mount_transfer(
-                operation="move",
+                operation=operation,
                 src=src,
                 dst=dst,
                 overwrite=overwrite,
             )
             debug_info.update(queue_info)
-            return debug_info if return_debug else None
+            prepared.done = True
+            return prepared
 
-        exists_func = getattr(adapter_s, "exists", None)
-        stat_func = getattr(adapter_s, "stat_path", None)
-        delete_func = await cls._ensure_method(adapter_s, "delete")
-        move_func = await cls._ensure_method(adapter_s, "move")
-
-        dst_exists = False
-        dst_stat = None
-        if callable(exists_func):
-            dst_exists = await exists_func(root_d, rel_d)
-        if callable(stat_func):
-            dst_stat = await stat_func(root_d, rel_d)
+        # copy 在适配器不支持 delete 时交由 copy(overwrite=...) 自行覆盖，move/rename 必须能先删除目标
+        strict = operation != "copy"
+        if strict:
+            delete_func = await cls._ensure_method(adapter_s, "delete")
+        else:
+            delete_func = cls._adapter_method(adapter_s, "delete")
+        prepared.op_func = await cls._ensure_method(adapter_s, operation)
+
+        dst_exists, dst_stat = await cls._probe_destination(adapter_s, root_d, rel_d)
+        dst_exists = bool(dst_exists)
         debug_info["dst_exists"] = dst_exists
         debug_info["dst_stat"] = dst_stat
 
         if dst_exists and not overwrite:
+            if not strict:
+                raise HTTPException(409, detail="Destination already exists")
             kind = None
             fs_path = None
             if dst_stat:
@@ -67,20 +167,31 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
                 409,
                 detail=f"Destination already exists(kind={kind}, fs_path={fs_path}, rel_d={rel_d}, overwrite={overwrite})",
             )
-        if dst_exists and overwrite:
+        if dst_exists and overwrite and delete_func is not None:
             try:
                 await delete_func(root_s, rel_d)
                 debug_info["pre_delete"] = "ok"
             except Exception as exc:
                 debug_info["pre_delete"] = f"error:{exc}"
-                raise HTTPException(500, detail=f"Pre-delete failed before overwrite: {exc}")
+                suffix = " before overwrite" if strict else ""
+                raise HTTPException(500, detail=f"Pre-delete failed{suffix}: {exc}")
 
         if rel_s == rel_d:
             debug_info["noop"] = True
+            prepared.done = True
+        return prepared
+
+    @classmethod
+    async def move_path(
+        cls, src: str, dst: str, overwrite: bool = False, return_debug: bool = True, allow_cross: bool = False
+    ):
+        prepared = await cls._prepare_transfer(src, dst, "move", overwrite, allow_cross)
+        debug_info = prepared.debug_info
+        if prepared.done:
             return debug_info if return_debug else None
 
         try:
-            await move_func(root_s, rel_s, rel_d)
+            await prepared.op_func(prepared.root_s, prepared.rel_s, prepared.rel_d)
             debug_info["moved"] = True
         except FileNotFoundError:
             raise HTTPException(404, detail="Source not found")
@@ -95,62 +206,13 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
 
     @classmethod
     async def rename_path(cls, src: str, dst: str, overwrite: bool = False, return_debug: bool = True):
-        adapter_s, adapter_model_s, root_s, rel_s = await cls.resolve_adapter_and_rel(src)
-        adapter_d, adapter_model_d, root_d, rel_d = await cls.resolve_adapter_and_rel(dst)
-        debug_info = {
-            "src": src,
-            "dst": dst,
-            "rel_s": rel_s,
-            "rel_d": rel_d,
-            "root_s": root_s,
-            "root_d": root_d,
-            "overwrite": overwrite,
-        }
-        if adapter_model_s.id != adapter_model_d.id:
-            raise HTTPException(400, detail="Cross-adapter rename not supported")
-        if not rel_s:
-            raise HTTPException(400, detail="Cannot rename mount root")
-        if not rel_d:
-            raise HTTPException(400, detail="Invalid destination")
-
-        exists_func = getattr(adapter_s, "exists", None)
-        stat_func = getattr(adapter_s, "stat_path", None)
-        delete_func = await cls._ensure_method(adapter_s, "delete")
-        rename_func = await cls._ensure_method(adapter_s, "rename")
-
-        dst_exists = False
-        dst_stat = None
-        if callable(exists_func):
-            dst_exists = await exists_func(root_d, rel_d)
-        if callable(stat_func):
-            dst_stat = await stat_func(root_d, rel_d)
-        debug_info["dst_exists"] = dst_exists
-        debug_info["dst_stat"] = dst_stat
-
-        if dst_exists and not overwrite:
-            kind = None
-            fs_path = None
-            if dst_stat:
-                kind = "dir" if dst_stat.get("is_dir") else "file"
-                fs_path = dst_stat.get("path")
-            raise HTTPException(
-                409,
-                detail=f"Destination already exists(kind={kind}, fs_path={fs_path}, rel_d={rel_d}, overwrite={overwrite})",
-            )
-        if dst_exists and overwrite:
-            try:
-                await delete_func(root_s, rel_d)
-                debug_info["pre_delete"] = "ok"
-            except Exception as exc:
-                debug_info["pre_delete"] = f"error:{exc}"
-                raise HTTPException(500, detail=f"Pre-delete failed before overwrite: {exc}")
-
-        if rel_s == rel_d:
-            debug_info["noop"] = True
+        prepared = await cls._prepare_transfer(src, dst, "rename", overwrite)
+        debug_info = prepared.debug_info
+        if prepared.done:
             return debug_info if return_debug else None
 
         try:
-            await rename_func(root_s, rel_s, rel_d)
+            await prepared.op_func(prepared.root_s, prepared.rel_s, prepared.rel_d)
             debug_info["renamed"] = True
         except FileNotFoundError:
             raise HTTPException(404, detail="Source not found")
@@ -167,66 +229,13 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
     async def copy_path(
         cls, src: str, dst: str, overwrite: bool = False, return_debug: bool = True, allow_cross: bool = False
     ):
-        adapter_s, adapter_model_s, root_s, rel_s = await cls.resolve_adapter_and_rel(src)
-        adapter_d, adapter_model_d, root_d, rel_d = await cls.resolve_adapter_and_rel(dst)
-        debug_info = {
-            "src": src,
-            "dst": dst,
-            "rel_s": rel_s,
-            "rel_d": rel_d,
-            "root_s": root_s,
-            "root_d": root_d,
-            "overwrite": overwrite,
-            "operation": "copy",
-            "queued": False,
-        }
-        if not rel_s:
-            raise HTTPException(400, detail="Cannot copy mount root")
-        if not rel_d:
-            raise HTTPException(400, detail="Invalid destination")
-
-        if adapter_model_s.id != adapter_model_d.id:
-            if not allow_cross:
-                raise HTTPException(400, detail="Cross-adapter copy not supported")
-            queue_info = await cls._enqueue_cross_mount_transfer(
-                operation="copy",
-                src=src,
-                dst=dst,
-                overwrite=overwrite,
-            )
-            debug_info.update(queue_info)
-            return debug_info if return_debug else None
-
-        exists_func = getattr(adapter_s, "exists", None)
-        stat_func = getattr(adapter_s, "stat_path", None)
-        delete_func = getattr(adapter_s, "delete", None)
-        copy_func = await cls._ensure_method(adapter_s, "copy")
-
-        dst_exists = False
-        dst_stat = None
-        if callable(exists_func):
-            dst_exists = await exists_func(root_d, rel_d)
-        if callable(stat_func):
-            dst_stat = await stat_func(root_d, rel_d)
-        debug_info["dst_exists"] = dst_exists
-        debug_info["dst_stat"] = dst_stat
-
-        if dst_exists and not overwrite:
-            raise HTTPException(409, detail="Destination already exists")
-        if dst_exists and overwrite and callable(delete_func):
-            try:
-                await delete_func(root_s, rel_d)
-                debug_info["pre_delete"] = "ok"
-            except Exception as exc:
-                debug_info["pre_delete"] = f"error:{exc}"
-                raise HTTPException(500, detail=f"Pre-delete failed: {exc}")
-
-        if rel_s == rel_d:
-            debug_info["noop"] = True
+        prepared = await cls._prepare_transfer(src, dst, "copy", overwrite, allow_cross)
+        debug_info = prepared.debug_info
+        if prepared.done:
             return debug_info if return_debug else None
 
         try:
-            await copy_func(root_s, rel_s, rel_d, overwrite=overwrite)
+            await prepared.op_func(prepared.root_s, prepared.rel_s, prepared.rel_d, overwrite=overwrite)
             debug_info["copied"] = True
         except FileNotFoundError:
             raise HTTPException(404, detail="Source not found")
@@ -247,11 +256,8 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
         if adapter_model_s.id == adapter_model_d.id:
             raise HTTPException(400, detail="Cross-adapter transfer requested but adapters are identical")
 
-        dst_exists = False
-        exists_func = getattr(adapter_d, "exists", None)
-        if callable(exists_func):
-            dst_exists = await exists_func(root_d, rel_d)
-        else:
+        dst_exists, _ = await cls._probe_destination(adapter_d, root_d, rel_d)
+        if dst_exists is None:
             try:
                 await cls.stat_file(dst)
                 dst_exists = True
@@ -273,8 +279,6 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
             "overwrite": overwrite,
         }
 
-        from domain.tasks import task_queue_service
-
         task = await task_queue_service.add_task("cross_mount_transfer", payload)
         return {
             "queued": True,
@@ -285,9 +289,22 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
         }
 
     @classmethod
-    async def run_cross_mount_transfer_task(cls, task: "Task") -> Dict[str, Any]:
-        from domain.tasks import task_queue_service
+    def _best_tmp_dir(cls, staged_bytes: int) -> Path:
+        """待暂存的字节数已确定且足够小时优先使用内存盘 /dev/shm，否则落到配置的临时目录"""
+        shm = Path("/dev/shm")
+        if staged_bytes > 0 and os.access(shm, os.W_OK):
+            try:
+                ram = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+                shm_free = shutil.disk_usage(shm).free
+            except (AttributeError, ValueError, OSError):
+                ram = shm_free = 0
+            if staged_bytes < min(ram // 4, shm_free):
+                return shm
+        cls.CROSS_TRANSFER_TEMP_ROOT.mkdir(parents=True, exist_ok=True)
+        return cls.CROSS_TRANSFER_TEMP_ROOT
 
+    @classmethod
+    async def run_cross_mount_transfer_task(cls, task: Task) -> Dict[str, Any]:
         params = task.task_info or {}
         operation = params.get("operation")
         src = params.get("src")
@@ -323,11 +340,18 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
         if not rel_d:
             raise ValueError("Invalid destination")
 
-        dst_exists = False
-        exists_func = getattr(adapter_d, "exists", None)
-        if callable(exists_func):
-            dst_exists = await exists_func(root_d, rel_d)
-        else:
+        try:
+            src_stat = await cls.stat_file(src)
+        except HTTPException as exc:
+            if exc.status_code == 404:
+                raise FileNotFoundError(src) from exc
+            raise
+
+        src_is_dir = bool(src_stat.get("is_dir"))
+
+        # 并非所有适配器的写入都按名称覆盖（如 Telegram 每次写入都是新消息），单文件同样需要先探测并删除目标
+        dst_exists, _ = await cls._probe_destination(adapter_d, root_d, rel_d)
+        if dst_exists is None:
             try:
                 await cls.stat_file(dst)
                 dst_exists = True
@@ -342,16 +366,6 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
         if dst_exists and overwrite:
             await cls.delete_path(dst)
 
-        try:
-            src_stat = await cls.stat_file(src)
-        except HTTPException as exc:
-            if exc.status_code == 404:
-                raise FileNotFoundError(src) from exc
-            raise
-
-        src_is_dir = bool(src_stat.get("is_dir"))
-
-        files_to_transfer: List[Dict[str, Any]] = []
         dirs_to_create: List[str] = []
 
         await task_queue_service.update_progress(
@@ -363,153 +377,240 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
             },
         )
 
-        if src_is_dir:
-            if rel_d:
-                dirs_to_create.append(rel_d)
-            list_dir = await cls._ensure_method(adapter_s, "list_dir")
-            stack: List[Tuple[str, str, str]] = [(rel_s, rel_d, "")]
-            page_size = 200
-
-            while stack:
-                current_rel, current_dst_rel, current_relative = stack.pop()
-                page = 1
-                while True:
-                    entries, total = await list_dir(root_s, current_rel, page, page_size, "name", "asc")
-                    if not entries and (total or 0) == 0:
-                        break
-                    for entry in entries:
-                        name = entry.get("name")
-                        if not name:
-                            continue
-                        child_rel = cls._join_rel(current_rel, name)
-                        child_dst_rel = cls._join_rel(current_dst_rel, name)
-                        child_relative = cls._join_rel(current_relative, name)
-                        if entry.get("is_dir"):
-                            dirs_to_create.append(child_dst_rel)
-                            stack.append((child_rel, child_dst_rel, child_relative))
-                        else:
-                            files_to_transfer.append(
-                                {
-                                    "src_rel": child_rel,
-                                    "dst_rel": child_dst_rel,
-                                    "relative_rel": child_relative or name,
-                                    "size": entry.get("size"),
-                                    "name": name,
-                                }
-                            )
-                    if total is None or page * page_size >= (total or 0):
-                        break
-                    page += 1
-        else:
-            relative_rel = rel_s or (src_stat.get("name") or "file")
-            files_to_transfer.append(
+        bytes_done = 0
+        total_bytes = 0
+        file_count = 0
+        walk_finished = False
+        # 源适配器不支持流式读取时才需要临时目录中转
+        stream_supported = callable(getattr(adapter_s, "stream_file", None))
+        src_local_path = cls._adapter_method(adapter_s, "get_local_path")
+        if cls._adapter_method(adapter_d, "copy_local_file") is None:
+            src_local_path = None
+        # 暂存目录按所在的基础目录（/dev/shm 或配置的临时目录）各建一个，结束时统一清理
+        temp_dirs: Dict[Path, Path] = {}
+
+        copy_buffer_size = await cls._copy_buffer_size()
+        concurrency = await cls._transfer_concurrency()
+        # 遍历与传输同时进行：遍历端把文件放入有界队列，传输端边取边传
+        job_queue: asyncio.Queue[TransferJob | None] = asyncio.Queue(maxsize=TRANSFER_QUEUE_SIZE)
+
+        mkdir_func = await cls._ensure_method(adapter_d, "mkdir")
+        # 支持批量建目录的适配器一次调用即可连同父目录一起创建
+        mkdirs_func = cls._adapter_method(adapter_d, "mkdirs")
+        dir_tasks: Dict[str, asyncio.Task] = {}
+
+        async def create_dir(rel_path: str):
+            if mkdirs_func is not None:
+                await mkdirs_func(root_d, [rel_path])
+                return
+            await ensure_dir(cls._parent_rel(rel_path))
+            try:
+                await mkdir_func(root_d, rel_path)
+            except FileExistsError:
+                pass
+            except HTTPException as exc:
+                if exc.status_code not in {409, 400}:
+                    raise
+            except Exception:
+                pass
+
+        async def ensure_dir(rel_path: str):
+            # 每个目录只创建一次，并发的文件传输共享同一个创建任务
+            if not rel_path:
+                return
+            pending = dir_tasks.get(rel_path)
+            if pending is None:
+                pending = dir_tasks[rel_path] = asyncio.create_task(create_dir(rel_path))
+            await pending
+
+        async def enqueue(job: TransferJob):
+            nonlocal file_count, total_bytes
+            job.index = file_count
+            file_count += 1
+            total_bytes += job.size or 0
+            await job_queue.put(job)
+
+        async def walk_source():
+            nonlocal walk_finished
+            if src_is_dir:
+                if rel_d:
+                    dirs_to_create.append(rel_d)
+                list_dir = await cls._ensure_method(adapter_s, "list_dir")
+                stack: List[Tuple[str, str]] = [(rel_s.rstrip("/"), rel_d.rstrip("/"))]
+                page_size = await cls._walk_page_size(adapter_s)
+
+                while stack:
+                    current_rel, current_dst_rel = stack.pop()
+                    # 每个目录只拼一次前缀，条目路径直接拼接，省去逐条调用 _join_rel
+                    src_prefix = f"{current_rel}/" if current_rel else ""
+                    dst_prefix = f"{current_dst_rel}/" if current_dst_rel else ""
+                    page = 1
+                    while True:
+                        entries, total = await list_dir(root_s, current_rel, page, page_size, "name", "asc")
+                        for entry in entries:
+                            name = entry.get("name")
+                            if not name:
+                                continue
+                            name = name.lstrip("/")
+                            child_rel = src_prefix + name
+                            child_dst_rel = dst_prefix + name
+                            if entry.get("is_dir"):
+                                dirs_to_create.append(child_dst_rel)
+                                stack.append((child_rel, child_dst_rel))
+                            else:
+                                await enqueue(
+                                    TransferJob(
+                                        src_rel=child_rel,
+                                        dst_rel=child_dst_rel,
+                                        size=entry.get("size"),
+                                        name=name,
+                                    )
+                                )
+                        # 短页即最后一页；total 缺失时继续翻页，直到出现短页
+                        if len(entries) < page_size or (total is not None and page * page_size >= total):
+                            break
+                        page += 1
+            else:
+                await enqueue(
+                    TransferJob(
+                        src_rel=rel_s,
+                        dst_rel=rel_d,
+                        size=src_stat.get("size"),
+                        name=src_stat.get("name") or rel_s.split("/")[-1],
+                    )
+                )
+            walk_finished = True
+            for _ in range(concurrency):
+                await job_queue.put(None)
+
+        last_progress_ts = 0.0
+        last_progress_bytes = 0
+
+        async def report_progress(detail: str):
+            # 按时间和字节数节流，小文件很多时不必每个文件都刷新一次进度
+            nonlocal last_progress_ts, last_progress_bytes
+            now = time.monotonic()
+            if (
+                now - last_progress_ts < PROGRESS_MIN_INTERVAL
+                and bytes_done - last_progress_bytes < PROGRESS_MIN_BYTES
+            ):
+                return
+            last_progress_ts = now
+            last_progress_bytes = bytes_done
+            # 遍历尚未结束时总量仍在增长，不给出百分比
+            percent = None
+            total_for_percent = total_bytes or bytes_done
+            if walk_finished and total_for_percent:
+                percent = min(100.0, round(bytes_done / total_for_percent * 100, 2))
+            await task_queue_service.update_progress(
+                task.id,
                 {
-                    "src_rel": rel_s,
-                    "dst_rel": rel_d,
-                    "relative_rel": relative_rel,
-                    "size": src_stat.get("size"),
-                    "name": src_stat.get("name") or rel_s.split("/")[-1],
-                }
+                    "stage": "transferring",
+                    "percent": percent,
+                    "bytes_done": bytes_done,
+                    "bytes_total": total_bytes or None,
+                    "detail": detail,
+                },
             )
-            parent_dir = cls._parent_rel(rel_d)
-            if parent_dir:
-                dirs_to_create.append(parent_dir)
-
-        cls.CROSS_TRANSFER_TEMP_ROOT.mkdir(parents=True, exist_ok=True)
-        temp_dir = cls.CROSS_TRANSFER_TEMP_ROOT / task.id
-        temp_dir.mkdir(parents=True, exist_ok=True)
-
-        bytes_downloaded = 0
-        total_dynamic_bytes = sum((f["size"] or 0) for f in files_to_transfer)
 
-        try:
-            for job in files_to_transfer:
-                src_abs = cls._build_absolute_path(adapter_model_s.path, job["src_rel"])
+        async def transfer_job(job: TransferJob):
+            nonlocal bytes_done, total_bytes
+            job_bytes = 0
+
+            async def count_bytes(chunks: AsyncIterator[bytes]):
+                nonlocal bytes_done, job_bytes
+                async for chunk in chunks:
+                    job_bytes += len(chunk)
+                    bytes_done += len(chunk)
+                    yield chunk
+                    await report_progress(f"Transferring {job.name}")
+
+            await ensure_dir(cls._parent_rel(job.dst_rel))
+            src_abs = cls._build_absolute_path(adapter_model_s.path, job.src_rel)
+            dst_abs = cls._build_absolute_path(adapter_model_d.path, job.dst_rel)
+            copied = None
+            if src_local_path is not None:
+                # 源和目标都在本机时直接在内核态复制，不经过 Python 缓冲
+                copied = await cls.copy_from_local_file(
+                    dst_abs, src_local_path(root_s, job.src_rel), overwrite=overwrite
+                )
+            if copied is not None:
+                job_bytes = int(copied.get("size") or 0)
+                bytes_done += job_bytes
+            elif stream_supported:
+                # 源端按块读出直接写入目标端，不落临时文件，内存占用与文件大小无关
+                await cls.write_file_stream(
+                    dst_abs, count_bytes(cls.open_read_stream(src_abs)), overwrite=overwrite
+                )
+            else:
                 data = await cls.read_file(src_abs)
-                temp_path = temp_dir / job["relative_rel"]
-                temp_path.parent.mkdir(parents=True, exist_ok=True)
-                async with aiofiles.open(temp_path, "wb") as f:
+                # 按本文件的实际大小选择暂存位置；遍历尚未结束时总量只是部分和，不能据此占用内存盘。
+                # 暂存文件上传后立即删除，最坏情况是每个传输并发同时暂存一个同样大小的文件
+                base_dir = cls._best_tmp_dir(len(data) * concurrency)
+                temp_dir = temp_dirs.get(base_dir)
+                if temp_dir is None:
+                    temp_dir = Path(tempfile.mkdtemp(prefix=f"xfer-{task.id}-", dir=base_dir))
+                    temp_dirs[base_dir] = temp_dir
+                # 临时目录保持扁平，不必为每个文件重建源目录层级
+                temp_path = temp_dir / f"{job.index:08x}.bin"
+                async with aiofiles.open(temp_path, "wb", buffering=copy_buffer_size) as f:
                     await f.write(data)
-                actual_size = len(data)
-                job["temp_path"] = temp_path
-                prev_size = job.get("size") or 0
-                if prev_size <= 0:
-                    total_dynamic_bytes += actual_size
-                    job_size = actual_size
-                else:
-                    job_size = prev_size
-                job["size"] = job_size
-                bytes_downloaded += actual_size
-                percent = None
-                total_for_percent = total_dynamic_bytes if total_dynamic_bytes else bytes_downloaded
-                if total_for_percent:
-                    percent = min(100.0, round(bytes_downloaded / total_for_percent * 100, 2))
-                await task_queue_service.update_progress(
-                    task.id,
-                    {
-                        "stage": "downloading",
-                        "percent": percent,
-                        "bytes_done": bytes_downloaded,
-                        "bytes_total": total_dynamic_bytes or None,
-                        "detail": f"Downloaded {job['name']}",
-                    },
-                )
-
-            mkdir_func = await cls._ensure_method(adapter_d, "mkdir")
-            ensured_dirs: set[str] = set()
-
-            async def ensure_dir(rel_path: str):
-                if not rel_path or rel_path in ensured_dirs:
-                    return
-                parent = cls._parent_rel(rel_path)
-                if parent:
-                    await ensure_dir(parent)
+                job_bytes = len(data)
+                bytes_done += job_bytes
+                del data
                 try:
-                    await mkdir_func(root_d, rel_path)
-                except FileExistsError:
-                    pass
-                except HTTPException as exc:
-                    if exc.status_code not in {409, 400}:
-                        raise
-                except Exception:
-                    pass
-                ensured_dirs.add(rel_path)
-
-            for dir_rel in sorted({d for d in dirs_to_create if d}, key=lambda x: x.count("/")):
-                await ensure_dir(dir_rel)
-
-            uploaded_bytes = 0
-            total_bytes = sum((f["size"] or 0) for f in files_to_transfer)
-
-            async def iter_temp_file(path: Path, chunk_size: int = 512 * 1024):
-                async with aiofiles.open(path, "rb") as f:
-                    while True:
-                        chunk = await f.read(chunk_size)
-                        if not chunk:
-                            break
-                        yield chunk
-
-            for job in files_to_transfer:
-                parent_dir = cls._parent_rel(job["dst_rel"])
-                if parent_dir:
-                    await ensure_dir(parent_dir)
-                dst_abs = cls._build_absolute_path(adapter_model_d.path, job["dst_rel"])
-                temp_path: Path = job["temp_path"]
-                await cls.write_file_stream(dst_abs, iter_temp_file(temp_path), overwrite=overwrite)
-                uploaded_bytes += job["size"] or 0
-                percent = None
-                if total_bytes:
-                    percent = min(100.0, round(uploaded_bytes / total_bytes * 100, 2))
-                await task_queue_service.update_progress(
-                    task.id,
-                    {
-                        "stage": "uploading",
-                        "percent": percent,
-                        "bytes_done": uploaded_bytes,
-                        "bytes_total": total_bytes or None,
-                        "detail": f"Uploaded {job['name']}",
-                    },
-                )
+                    imported = await cls.import_temp_file(dst_abs, temp_path, overwrite=overwrite)
+                    if imported is None:
+                        await cls.write_file_stream(
+                            dst_abs, iter_file_chunks(temp_path, copy_buffer_size), overwrite=overwrite
+                        )
+                finally:
+                    # 上传结束立即删除，临时文件不会随任务进度在磁盘上累积
+                    await asyncio.to_thread(temp_path.unlink, missing_ok=True)
+            if not job.size:
+                total_bytes += job_bytes
+                job.size = job_bytes
+            await report_progress(f"Transferred {job.name}")
+
+        async def transfer_worker():
+            while True:
+                job = await job_queue.get()
+                if job is None:
+                    return
+                await transfer_job(job)
+
+        try:
+            runners = [asyncio.create_task(walk_source())]
+            runners += [asyncio.create_task(transfer_worker()) for _ in range(concurrency)]
+            try:
+                await asyncio.gather(*runners)
+            finally:
+                # 任一环节失败时停止遍历和其余传输，避免在清理临时目录后仍有写入
+                for runner in runners:
+                    runner.cancel()
+                await asyncio.gather(*runners, return_exceptions=True)
+                for dir_task in dir_tasks.values():
+                    dir_task.cancel()
+                await asyncio.gather(*dir_tasks.values(), return_exceptions=True)
+
+            # 空目录不会被文件传输顺带创建，遍历结束后补齐；已随文件创建过的目录直接跳过
+            # 单次遍历按深度分桶，父目录总排在子目录之前
+            seen_dirs: set[str] = set()
+            depth_buckets: List[List[str]] = []
+            for dir_rel in dirs_to_create:
+                if not dir_rel or dir_rel in seen_dirs or dir_rel in dir_tasks:
+                    continue
+                seen_dirs.add(dir_rel)
+                depth = dir_rel.count("/")
+                while len(depth_buckets) <= depth:
+                    depth_buckets.append([])
+                depth_buckets[depth].append(dir_rel)
+            pending_dirs = [dir_rel for bucket in depth_buckets for dir_rel in bucket]
+            if mkdirs_func is not None:
+                if pending_dirs:
+                    await mkdirs_func(root_d, pending_dirs)
+            else:
+                await asyncio.gather(*(ensure_dir(dir_rel) for dir_rel in pending_dirs))
 
             if operation == "move":
                 await cls.delete_path(src)
@@ -528,7 +629,7 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
             await task_queue_service.update_meta(
                 task.id,
                 {
-                    "files": len(files_to_transfer),
+                    "files": file_count,
                     "directories": len({d for d in dirs_to_create if d}),
                     "bytes": total_bytes,
                     "operation": operation,
@@ -540,13 +641,11 @@ class VirtualFSTransferMixin(VirtualFSFileOpsMixin):
                 "operation": operation,
                 "src": src,
                 "dst": dst,
-                "files": len(files_to_transfer),
+                "files": file_count,
                 "bytes": total_bytes,
             }
 
         finally:
-            try:
-                if temp_dir.exists():
-                    shutil.rmtree(temp_dir)
-            except Exception:
-                pass
+            # 成功的文件已逐个删除，这里只清理失败时残留的文件；删除放到线程中，不阻塞事件循环
+            for temp_dir in temp_dirs.values():
+                await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
@@ -1,18 +1,22 @@
 import os
+import re
+from email.utils import formatdate
+from hashlib import md5
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from domain.adapters import runtime_registry
+from domain.ai import shutdown_http_client
 from domain.agent.mcp import MCP_HTTP_APP
 from domain.config import ConfigService, VERSION
 from db.session import close_db, init_db
 from api.routers import include_routers
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
-from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.routing import Match, Route
 from middleware.exception_handler import (
     global_exception_handler,
     http_exception_handler,
@@ -24,43 +28,86 @@ from dotenv import load_dotenv
 from domain.tasks import task_queue_service, task_scheduler
 from domain.role.service import RoleService
 from domain.notices import notice_sync_service
+from domain.plugins import init_plugins
+from domain.virtual_fs import shutdown_thumb_pool
 
 load_dotenv()
 
 
-class SPAStaticFiles(StaticFiles):
+class ImmutableStaticFiles(StaticFiles):
+    """构建产物目录：文件名带内容哈希，可让浏览器长期缓存"""
+
     async def get_response(self, path, scope):
-        try:
-            response = await super().get_response(path, scope)
-        except StarletteHTTPException as exc:
-            if exc.status_code != 404:
-                raise
-            if self._should_spa_fallback(scope):
-                return FileResponse(INDEX_FILE)
-            raise
-
-        if response.status_code == 404 and self._should_spa_fallback(scope):
-            return FileResponse(INDEX_FILE)
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["cache-control"] = "public, max-age=31536000, immutable"
         return response
 
-    @staticmethod
-    def _should_spa_fallback(scope) -> bool:
-        return (
-            scope.get("method") == "GET"
-            and _request_accepts_html(scope)
-            and not (scope.get("path") or "").startswith(SPA_EXCLUDE_PREFIXES)
-            and INDEX_FILE.exists()
-        )
-
 
-INDEX_FILE = Path("web/dist/index.html")
-SPA_EXCLUDE_PREFIXES = ("/api", "/docs", "/openapi.json", "/webdav", "/s3")
+class SPAIndexRoute(Route):
+    """前端路由页面：既不是静态文件也不属于后端前缀的 GET 页面请求，直接返回内存中的 index.html"""
+
+    def __init__(self, index_page: tuple[bytes, dict[str, str]], static_paths: set[str]):
+        self.index_page = index_page
+        self.static_paths = static_paths
+        super().__init__("/{full_path:path}", self.serve_index, methods=["GET"], include_in_schema=False)
+
+    def matches(self, scope):
+        path = scope.get("path") or ""
+        if (
+            scope.get("type") != "http"
+            or scope.get("method") != "GET"
+            or path in self.static_paths
+            or SPA_EXCLUDE_RE.match(path)
+            or not _request_accepts_html(scope)
+        ):
+            return Match.NONE, {}
+        return super().matches(scope)
+
+    async def serve_index(self, request: Request) -> Response:
+        content, headers = self.index_page
+        if request.headers.get("if-none-match") == headers["etag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(content, media_type="text/html", headers=headers)
+
+
+WEB_DIST_DIR = Path("web/dist")
+ASSETS_DIR = WEB_DIST_DIR / "assets"
+INDEX_FILE = WEB_DIST_DIR / "index.html"
+SPA_EXCLUDE_PREFIXES = ("/api", "/docs", "/openapi.json", "/webdav", "/s3", "/assets")
+# 只匹配完整的路径段，/api 命中 /api 与 /api/...，不会误伤 /apis 这类前端路由
+SPA_EXCLUDE_RE = re.compile("^(?:%s)(?:/|$)" % "|".join(re.escape(p) for p in SPA_EXCLUDE_PREFIXES))
+
+
+def _load_index_page() -> tuple[bytes, dict[str, str]] | None:
+    try:
+        content = INDEX_FILE.read_bytes()
+        stat = INDEX_FILE.stat()
+    except OSError:
+        return None
+    etag = md5(f"{stat.st_mtime}-{stat.st_size}".encode(), usedforsecurity=False).hexdigest()
+    headers = {
+        "etag": f'"{etag}"',
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    return content, headers
+
+
+def _list_static_paths() -> set[str]:
+    """构建目录中除 assets 外的文件（favicon、logo、plugin-frame.html 等），这些路径交给静态文件服务"""
+    if not WEB_DIST_DIR.is_dir():
+        return set()
+    return {
+        "/" + p.relative_to(WEB_DIST_DIR).as_posix()
+        for p in WEB_DIST_DIR.rglob("*")
+        if p.is_file() and ASSETS_DIR not in p.parents
+    }
 
 
 def _request_accepts_html(scope) -> bool:
     for k, v in scope.get("headers") or []:
         if k == b"accept":
-            return "text/html" in v.decode("latin-1")
+            return b"text/html" in v
     return False
 
 
@@ -75,13 +122,16 @@ async def lifespan(app: FastAPI):
     await task_queue_service.start_worker()
 
     # 加载已安装的插件
-    from domain.plugins import init_plugins
     await init_plugins(app)
     await task_scheduler.start()
     await notice_sync_service.start()
 
     # 在所有路由加载完成后，挂载静态文件服务（放在最后以避免覆盖 API 路由）
-    app.mount("/", SPAStaticFiles(directory="web/dist", html=True, check_dir=False), name="static")
+    app.mount("/assets", ImmutableStaticFiles(directory=ASSETS_DIR, check_dir=False), name="assets")
+    index_page = _load_index_page()
+    if index_page is not None:
+        app.router.routes.append(SPAIndexRoute(index_page, _list_static_paths()))
+    app.mount("/", StaticFiles(directory=WEB_DIST_DIR, html=True, check_dir=False), name="static")
 
     async with MCP_HTTP_APP.router.lifespan_context(MCP_HTTP_APP):
         try:
@@ -90,6 +140,9 @@ async def lifespan(app: FastAPI):
             await notice_sync_service.stop()
             await task_scheduler.stop()
             await task_queue_service.stop_worker()
+            shutdown_thumb_pool()
+            await shutdown_http_client()
+            await runtime_registry.close_all()
             await close_db()
 
 
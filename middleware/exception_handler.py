@@ -6,6 +6,9 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+# 错误详情的长度上限，避免把上游或异常中的超长文本原样回传
+MAX_ERROR_DETAIL_BYTES = 2048
+
 
 async def http_exception_handler(request: Request, exc: HTTPException):
     detail = exc.detail if exc.detail is not None else str(exc)
@@ -23,12 +26,24 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+def _upstream_error_text(resp: httpx.Response) -> str:
+    # 只解码前 MAX_ERROR_DETAIL_BYTES 字节，上游返回的超大错误页不整体转成 str
+    try:
+        content = resp.content
+    except httpx.ResponseNotRead:
+        return ""
+    text = content[:MAX_ERROR_DETAIL_BYTES].decode(resp.encoding or "utf-8", errors="replace")
+    if len(content) > MAX_ERROR_DETAIL_BYTES:
+        text += "..."
+    return text
+
+
 async def httpx_exception_handler(request: Request, exc: httpx.HTTPStatusError):
     resp = exc.response
     status_code = resp.status_code if resp is not None else status.HTTP_500_INTERNAL_SERVER_ERROR
     detail = None
     if resp is not None:
-        detail = resp.text or resp.reason_phrase
+        detail = _upstream_error_text(resp) or resp.reason_phrase
     if not detail:
         detail = str(exc)
     return JSONResponse(
@@ -46,5 +61,5 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content={"error": "Internal Server Error", "detail": str(exc)},
+        content={"error": "Internal Server Error", "detail": str(exc)[:MAX_ERROR_DETAIL_BYTES]},
     )
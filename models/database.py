@@ -94,6 +94,8 @@ class PathRule(Model):
 
     class Meta:
         table = "path_rules"
+        # 按角色取规则并按优先级排序
+        indexes = (("role_id", "priority"),)
 
 
 class Configuration(Model):
@@ -194,6 +196,8 @@ class AutomationTask(Model):
 
     class Meta:
         table = "automation_tasks"
+        # 事件触发时按 event + enabled 查询
+        indexes = (("event", "enabled"),)
 
 
 class AuditLog(Model):
@@ -215,6 +219,8 @@ class AuditLog(Model):
 
     class Meta:
         table = "audit_logs"
+        # 审计日志列表按时间倒序分页，并常按动作、成功与否和时间范围筛选
+        indexes = (("created_at",), ("action", "created_at"), ("success", "created_at"))
 
 
 class ShareLink(Model):
@@ -232,6 +238,8 @@ class ShareLink(Model):
 
     class Meta:
         table = "share_links"
+        # 用户分享列表按创建时间排序；清理过期分享按 expires_at 筛选
+        indexes = (("user_id", "created_at"), ("user_id", "expires_at"))
 
 
 class VideoRoom(Model):